@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+
+# 文件写入工具，tweet_to_weibo.py和x_scraper.py共用
+
+import os
+
+def write_file_atomic(path, data, fsync=False):
+    """先写入临时文件再原子替换目标文件，写入中途退出时不会留下被截断的文件
+    
+    fsync为True时在替换前将临时文件同步到磁盘，断电后也不会留下空文件。
+    """
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_file, path)
@@ -5,29 +5,23 @@
 
 import os
 import sys
-import time
+import asyncio
 import json
 import logging
 import argparse
-import subprocess
 import configparser
+import importlib.util
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("x_service.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("XService")
 
 # 解析命令行参数
 parser = argparse.ArgumentParser(description='抓取推文并发布到微博（自动切换API和无API模式）')
 parser.add_argument('--username', type=str, help='要抓取的X用户名（不含@符号）')
 parser.add_argument('--interval', type=int, default=10, help='检查间隔（分钟）')
+parser.add_argument('--min-interval', type=int, default=2, help='有新推文时缩短检查间隔的下限（分钟）')
+parser.add_argument('--max-interval', type=int, default=60, help='没有新推文时延长检查间隔的上限（分钟）')
 parser.add_argument('--count', type=int, default=5, help='每次抓取的最大推文数量')
 parser.add_argument('--test', action='store_true', help='测试模式，不实际发布到微博')
 parser.add_argument('--once', action='store_true', help='仅运行一次，不循环检查')
@@ -42,7 +36,7 @@ config_file = 'config.ini'
 if os.path.exists(config_file):
     config.read(config_file)
 else:
-    logger.warning(f"找不到配置文件 {config_file}，使用默认设置")
+    logger.warning("找不到配置文件 %s，使用默认设置", config_file)
 
 # API模式状态跟踪
 USE_API_MODE = not args.no_api  # 默认使用API模式，除非指定--no-api
@@ -63,8 +57,12 @@ if 'API_SWITCH' in config and 'API_RECOVERY_MINUTES' in config['API_SWITCH']:
 
 LAST_API_FAILURE = None  # 最后一次API失败的时间
 
+CYCLE_TIMEOUT_MINUTES = 10  # 单轮抓取和处理的超时时间（分钟）
+
+tweet_to_weibo = None  # 推文处理模块，在check_config中依赖检查通过后导入
+
 def run_scraper():
-    """运行推文抓取器"""
+    """运行推文抓取器，抓取后在同一次调用中完成翻译和发布"""
     global USE_API_MODE, API_FAILURE_COUNT, LAST_API_FAILURE
     
     # 如果禁用了自动切换，并且是无API模式，则直接使用无API模式
@@ -77,39 +75,45 @@ def run_scraper():
         # 如果上次API失败已经超过设定的恢复时间，尝试重新使用API
         recovery_seconds = API_RECOVERY_MINUTES * 60
         if (current_time - LAST_API_FAILURE).total_seconds() > recovery_seconds:
-            logger.info(f"自上次API失败已超过{API_RECOVERY_MINUTES}分钟，尝试重新使用API模式")
+            logger.info("自上次API失败已超过%s分钟，尝试重新使用API模式", API_RECOVERY_MINUTES)
             USE_API_MODE = True
             API_FAILURE_COUNT = 0
     
     # 根据当前模式运行不同的抓取方式
     if USE_API_MODE:
         logger.info("使用X API模式抓取推文...")
-        # 直接调用tweet_to_weibo.py，让它自动处理API逻辑
-        cmd = [sys.executable, 'tweet_to_weibo.py', '--force', '--once']
+        # 直接调用tweet_to_weibo，让它自动处理API逻辑
+        run_args = ['--force', '--once']
         
         if args.username:
-            cmd.extend(['--artist', args.username])
+            run_args.extend(['--artist', args.username])
         if args.count:
-            cmd.extend(['--count', str(args.count)])
+            run_args.extend(['--count', str(args.count)])
         if args.test:
-            cmd.append('--test')
+            run_args.append('--test')
         # 添加Windows路径参数
         if args.windows_path:
-            cmd.extend(['--windows-path', args.windows_path])
+            run_args.extend(['--windows-path', args.windows_path])
             
         try:
-            logger.info(f"执行命令: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            logger.info("调用推文处理器，参数: %s", ' '.join(run_args))
+            status = tweet_to_weibo.run(tweet_to_weibo.parser.parse_args(run_args))
             
             # 检查是否出现API错误
-            if result.returncode != 0 or "X API请求次数超过限制" in result.stdout or "X API请求次数超过限制" in result.stderr:
+            if status != tweet_to_weibo.EXIT_OK:
                 API_FAILURE_COUNT += 1
                 LAST_API_FAILURE = current_time
-                logger.warning(f"API模式失败 ({API_FAILURE_COUNT}/{MAX_API_FAILURES}): {result.stderr}")
+                if status == tweet_to_weibo.EXIT_RATE_LIMITED:
+                    reason = "X API请求次数超过限制"
+                elif status == tweet_to_weibo.EXIT_AUTH_FAILED:
+                    reason = "X API认证失败"
+                else:
+                    reason = f"状态码 {status}"
+                logger.warning("API模式失败 (%s/%s): %s", API_FAILURE_COUNT, MAX_API_FAILURES, reason)
                 
                 # 如果连续失败次数达到阈值，切换到无API模式
                 if API_FAILURE_COUNT >= MAX_API_FAILURES:
-                    logger.warning(f"连续{MAX_API_FAILURES}次API失败，切换到无API模式")
+                    logger.warning("连续%s次API失败，切换到无API模式", MAX_API_FAILURES)
                     USE_API_MODE = False
                     # 立即使用无API模式重试
                     return run_scraper()
@@ -124,84 +128,53 @@ def run_scraper():
         except Exception as e:
             API_FAILURE_COUNT += 1
             LAST_API_FAILURE = current_time
-            logger.error(f"运行API模式抓取器时出错: {e}")
+            logger.error("运行API模式抓取器时出错: %s", e)
             
             # 如果连续失败次数达到阈值，切换到无API模式
             if API_FAILURE_COUNT >= MAX_API_FAILURES:
-                logger.warning(f"连续{MAX_API_FAILURES}次API失败，切换到无API模式")
+                logger.warning("连续%s次API失败，切换到无API模式", MAX_API_FAILURES)
                 USE_API_MODE = False
                 # 立即使用无API模式重试
                 return run_scraper()
                 
             return False
     else:
-        # 无API模式
+        # 无API模式，由tweet_to_weibo调用x_scraper抓取后直接翻译和发布
         logger.info("使用无API模式抓取推文...")
-        cmd = [sys.executable, 'x_scraper.py', '--once', '--force']
+        run_args = ['--once', '--force', '--no-api']
         
         if args.username:
-            cmd.extend(['--username', args.username])
+            run_args.extend(['--artist', args.username])
         if args.count:
-            cmd.extend(['--count', str(args.count)])
+            run_args.extend(['--count', str(args.count)])
         # 添加Windows路径参数
         if args.windows_path:
-            cmd.extend(['--windows-path', args.windows_path])
+            run_args.extend(['--windows-path', args.windows_path])
         # 添加测试模式参数
         if args.test:
-            cmd.append('--test')
+            run_args.append('--test')
         
         try:
-            logger.info(f"执行命令: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            logger.info("调用推文处理器，参数: %s", ' '.join(run_args))
+            status = tweet_to_weibo.run(tweet_to_weibo.parser.parse_args(run_args))
             
-            if result.returncode != 0:
-                logger.error(f"无API抓取失败: {result.stderr}")
+            if status != tweet_to_weibo.EXIT_OK:
+                logger.error("无API模式处理失败，状态码: %s", status)
                 return False
                 
-            logger.info("无API模式抓取成功完成")
+            logger.info("无API模式抓取和处理成功完成")
             return True
         except Exception as e:
-            logger.error(f"运行无API抓取器时出错: {e}")
+            logger.error("运行无API模式处理器时出错: %s", e)
             return False
 
-def run_tweet_processor():
-    """运行推文处理器（翻译和发布）"""
-    # 如果是无API模式，需要单独运行处理器
-    if not USE_API_MODE:
-        logger.info("运行推文处理器...")
-        
-        cmd = [sys.executable, 'tweet_to_weibo.py', '--once', '--force']
-        
-        if args.username:
-            cmd.extend(['--artist', args.username])
-        if args.test:
-            cmd.append('--test')
-        # 添加Windows路径参数
-        if args.windows_path:
-            cmd.extend(['--windows-path', args.windows_path])
-        
-        try:
-            logger.info(f"执行命令: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"处理推文失败: {result.stderr}")
-                return False
-                
-            logger.info("推文处理成功完成")
-            return True
-        except Exception as e:
-            logger.error(f"运行处理器时出错: {e}")
-            return False
-    else:
-        # API模式下已经在run_scraper中处理了
-        return True
-
 def check_config():
-    """检查配置文件和依赖是否已准备好"""
+    """检查配置文件和依赖是否已准备好，通过后导入推文处理模块"""
+    global tweet_to_weibo
+    
     # 打印调试信息
-    logger.info(f"[DEBUG] sys.executable: {sys.executable}")
-    logger.info(f"[DEBUG] sys.path: {sys.path}")
+    logger.info("[DEBUG] sys.executable: %s", sys.executable)
+    logger.info("[DEBUG] sys.path: %s", sys.path)
     
     # 检查配置文件
     if not os.path.exists('config.ini'):
@@ -216,24 +189,89 @@ def check_config():
     if not os.path.exists('tweet_to_weibo.py'):
         logger.error("找不到tweet_to_weibo.py文件")
         return False
+        
+    if not os.path.exists('wsl_path.py'):
+        logger.error("找不到wsl_path.py文件")
+        return False
+        
+    if not os.path.exists('file_utils.py'):
+        logger.error("找不到file_utils.py文件")
+        return False
+    
+    # 检查推文处理和无API抓取所需的库是否已安装（只查找模块，不执行导入）
+    for module, package in (('tweepy', 'tweepy'), ('openai', 'openai'), ('weibo', 'weibo'), ('tenacity', 'tenacity'),
+                            ('requests', 'requests'), ('orjson', 'orjson'),
+                            ('httpx', 'httpx[http2]'), ('h2', 'httpx[http2]'), ('selectolax', 'selectolax'), ('msgpack', 'msgpack')):
+        if importlib.util.find_spec(module) is None:
+            logger.error("未安装%s库，请先安装: pip install %s", package, package)
+            return False
     
-    # 检查 requests-html 库是否已安装
+    # 依赖检查通过后再导入推文处理模块（导入时会读取config.ini并创建API客户端）
     try:
-        import importlib
-        logger.info("[DEBUG] Attempting to import 'requests_html'")
-        importlib.import_module('requests_html')
-        logger.info("[DEBUG] 'requests_html' imported successfully")
-    except ImportError as e:
-        logger.error(f"[DEBUG] ImportError: {e}")
-        logger.error("未安装requests-html库，请先安装: pip install requests-html")
+        tweet_to_weibo = importlib.import_module('tweet_to_weibo')
+    except Exception as e:
+        logger.error("加载tweet_to_weibo.py失败，请检查config.ini: %r", e)
         return False
     
     return True
 
+def run_cycle():
+    """执行一轮抓取和处理，返回本轮新处理的推文数量"""
+    processed_before = len(tweet_to_weibo.load_processed_tweets())
+    
+    # 运行抓取器（同时完成翻译和发布）
+    run_scraper()
+    
+    return len(tweet_to_weibo.load_processed_tweets()) - processed_before
+
+async def main_loop(interval):
+    """定时检查循环，抓取和发布在工作线程中运行，等待期间不占用线程"""
+    # 当前检查间隔（秒），根据是否有新推文自适应调整
+    current_interval = interval * 60
+    
+    # 常驻的单线程工作池，所有轮次复用同一个线程，保证各轮不会重叠执行
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="XServiceCycle") as pool:
+        while True:
+            try:
+                new_count = await asyncio.wait_for(
+                    loop.run_in_executor(pool, run_cycle),
+                    timeout=CYCLE_TIMEOUT_MINUTES * 60
+                )
+            except asyncio.TimeoutError:
+                logger.warning("本轮抓取和处理超过%s分钟仍未完成，下一轮将在其结束后执行", CYCLE_TIMEOUT_MINUTES)
+                new_count = 0
+            
+            # 如果只运行一次就退出
+            if args.once:
+                logger.info("仅运行一次模式，程序结束")
+                break
+            
+            # 有新推文时缩短间隔，没有新推文时延长间隔
+            if new_count > 0:
+                current_interval = max(current_interval // 2, args.min_interval * 60)
+            else:
+                current_interval = min(current_interval * 2, args.max_interval * 60)
+                
+            # 等待下一次检查
+            next_check = datetime.now() + timedelta(seconds=current_interval)
+            logger.info("本次处理了 %s 条新推文，下一次检查时间: %s, 使用%s模式", new_count, next_check.strftime('%Y-%m-%d %H:%M:%S'), 'API' if USE_API_MODE else '无API')
+            await asyncio.sleep(current_interval)
+
 def main():
     """主函数"""
     global USE_API_MODE
     
+    # 配置日志，服务内所有模块（包括tweet_to_weibo和x_scraper）的日志统一写入x_service.log
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("x_service.log"),
+            logging.StreamHandler()
+        ]
+    )
+    
     logger.info("=== X推文抓取和发布服务开始运行 ===")
     
     # 检查配置和依赖
@@ -245,35 +283,20 @@ def main():
     mode = "测试模式" if args.test else "正常模式"
     api_mode = "强制无API模式" if args.no_api else ("智能API/无API切换模式" if ENABLE_AUTO_SWITCH else "API模式")
     interval = args.interval
-    logger.info(f"运行模式: {mode}, API模式: {api_mode}, 检查间隔: {interval}分钟")
-    logger.info(f"API切换设置: 启用={ENABLE_AUTO_SWITCH}, 最大失败次数={MAX_API_FAILURES}, 恢复时间={API_RECOVERY_MINUTES}分钟")
+    logger.info("运行模式: %s, API模式: %s, 检查间隔: %s分钟（自适应范围 %s-%s分钟）", mode, api_mode, interval, args.min_interval, args.max_interval)
+    logger.info("API切换设置: 启用=%s, 最大失败次数=%s, 恢复时间=%s分钟", ENABLE_AUTO_SWITCH, MAX_API_FAILURES, API_RECOVERY_MINUTES)
     
     # 显示Windows保存路径信息
     if args.windows_path:
-        logger.info(f"推文原文将保存到Windows路径: {args.windows_path}")
+        logger.info("推文原文将保存到Windows路径: %s", args.windows_path)
     
     # 仅运行一次或循环运行
     try:
-        while True:
-            # 运行抓取器
-            if run_scraper():
-                # 如果抓取成功，运行处理器
-                run_tweet_processor()
-            
-            # 如果只运行一次就退出
-            if args.once:
-                logger.info("仅运行一次模式，程序结束")
-                break
-                
-            # 等待下一次检查
-            next_check = datetime.now() + timedelta(minutes=interval)
-            logger.info(f"下一次检查时间: {next_check.strftime('%Y-%m-%d %H:%M:%S')}, 使用{'API' if USE_API_MODE else '无API'}模式")
-            time.sleep(interval * 60)
-            
+        asyncio.run(main_loop(interval))
     except KeyboardInterrupt:
         logger.info("程序被用户中断")
     except Exception as e:
-        logger.error(f"程序运行出错: {e}")
+        logger.error("程序运行出错: %s", e)
         
 if __name__ == "__main__":
     main() 
\ No newline at end of file
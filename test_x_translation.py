@@ -61,7 +61,8 @@ try:
         if tweets.data:
             print(f"获取到 {len(tweets.data)} 条推文")
             
-            # 2. 翻译推文
+            # 2. 翻译推文（所有推文共用同一个 OpenAI 客户端和连接池）
+            openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
             for tweet in tweets.data:
                 print("\n" + "="*50)
                 print(f"推文ID: {tweet.id}")
@@ -70,9 +71,7 @@ try:
                 
                 try:
                     print("正在翻译...")
-                    openai.api_key = OPENAI_API_KEY
-                    
-                    response = openai.chat.completions.create(
+                    response = openai_client.chat.completions.create(
                         model="gpt-3.5-turbo",
                         messages=[
                             {"role": "system", "content": "你是一位优秀的翻译，能够将文本准确地翻译成简体中文，同时保持原文的风格和感情。"},
@@ -4,38 +4,42 @@
 # 使用AI工具翻译成简体中文，然后发布到该艺人的微博账号上。
 
 import os
-import json
+import io
+import sys
 import time
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import configparser
 import argparse
 import random
-import subprocess
-import platform
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import tweepy
 import openai
+import orjson
 from weibo import Client as WeiboClient
 from urllib.parse import urlparse
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import html
 import re
 from http.client import IncompleteRead
-import traceback
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("tweet_to_weibo.log"),
-        logging.StreamHandler()
-    ]
-)
+from wsl_path import is_wsl, to_wsl_path
+from file_utils import write_file_atomic
+
+# 日志处理器由入口脚本统一配置，避免被其他脚本导入时重复输出
 logger = logging.getLogger("Tweet2Weibo")
 
-# 解析命令行参数
+# 运行状态码，同时用作脚本的退出码
+EXIT_OK = 0
+EXIT_RATE_LIMITED = 10  # X API请求次数超过限制
+EXIT_AUTH_FAILED = 11   # X API认证失败
+EXIT_ERROR = 12         # 其他错误
+
+# 命令行参数定义（作为脚本运行时解析，被 run_x_service 调用时由调用方传入）
 parser = argparse.ArgumentParser(description='从X抓取推文，翻译后发布到微博')
 parser.add_argument('--test', action='store_true', help='测试模式，不实际发布到微博')
 parser.add_argument('--force', action='store_true', help='强制检查新推文，忽略缓存')
@@ -43,15 +47,15 @@ parser.add_argument('--artist', type=str, help='要抓取的X用户名，覆盖
 parser.add_argument('--count', type=int, default=5, help='要抓取的最大推文数量')
 parser.add_argument('--once', action='store_true', help='仅运行一次，不循环检查')
 parser.add_argument('--windows-path', type=str, help='Windows系统保存路径，用于保存推文原文')
-args = parser.parse_args()
+parser.add_argument('--no-api', action='store_true', help='跳过X API，直接使用无API方式抓取推文')
 
 # 读取配置文件
 config = configparser.ConfigParser()
 config_file = 'config.ini'
 
 if not os.path.exists(config_file):
-    logger.error(f"配置文件 {config_file} 不存在，请基于 config.example.ini 创建")
-    exit(1)
+    logger.error("配置文件 %s 不存在，请基于 config.example.ini 创建", config_file)
+    sys.exit(EXIT_ERROR)
 
 config.read(config_file)
 
@@ -72,11 +76,9 @@ WEIBO_APP_KEY = config['WEIBO']['WEIBO_APP_KEY']
 WEIBO_APP_SECRET = config['WEIBO']['WEIBO_APP_SECRET']
 WEIBO_ACCESS_TOKEN = config['WEIBO']['WEIBO_ACCESS_TOKEN']
 
-# 读取设置，命令行参数优先
-X_USERNAME = args.artist or config['SETTINGS']['X_USERNAME']
-TEST_MODE = args.test or config['SETTINGS'].getboolean('TEST_MODE', fallback=True)
 CACHE_EXPIRY = int(config['SETTINGS'].getboolean('CACHE_EXPIRY_MINUTES', fallback=15))
-MAX_TWEETS = args.count
+MIN_FETCH_INTERVAL = config['SETTINGS'].getint('MIN_FETCH_INTERVAL_SECONDS', fallback=60)  # 两次请求X API的最小间隔（秒）
+MAX_IMAGE_BYTES = config['SETTINGS'].getint('MAX_IMAGE_BYTES', fallback=5 * 1024 * 1024)  # 单张图片的最大字节数
 
 # 添加备用翻译设置
 USE_BACKUP_TRANSLATOR = config['SETTINGS'].getboolean('USE_BACKUP_TRANSLATOR', fallback=True)
@@ -84,91 +86,331 @@ BACKUP_TRANSLATOR = config['SETTINGS'].get('BACKUP_TRANSLATOR', 'google')  # 支
 
 # 文件路径
 PROCESSED_TWEETS_FILE = "processed_tweets.json"
-CACHE_FILE = f"cache_{X_USERNAME}_tweets.json"
+PROCESSED_JOURNAL_FILE = "processed_tweets.journal"  # 追加写入的已处理推文ID日志，每行一个ID
+LAST_FETCH_FILE = os.path.join("state", "last_fetch")  # 修改时间记录上次成功请求X API的时间
+
+# 已处理推文ID的内存缓存，启动时加载一次
+_processed = set()
+_journal = None
+_processed_lock = threading.Lock()
+
+# 同时逐条翻译推文的最大线程数
+MAX_TRANSLATE_WORKERS = 4
+
+# X API速率限制的重置时间（Unix时间戳），在此之前不再请求X API
+_rate_limit_reset_at = None
+
+# 用户名到X用户ID的映射，避免每次抓取都调用 get_user
+_user_ids = {}
+
+# 缓存文件的解析结果：路径 -> (修改时间, 解析后的数据)
+_cache_file_data = {}
+
+# 复用连接的HTTP会话，用于下载图片和备用翻译服务
+# 连接池大小按同时请求的最大数量设置（每条推文最多9张图片同时下载，或多条推文同时使用备用翻译）
+_session = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max(9, MAX_TRANSLATE_WORKERS))
+_session.mount('https://', _http_adapter)
+_session.mount('http://', _http_adapter)
+
+# X API v2 客户端（使用 Bearer Token）和 OpenAI 客户端只创建一次，在各次调用间复用连接
+_x_client = tweepy.Client(bearer_token=X_BEARER_TOKEN)
+_openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+
+# 日语和英语推文的翻译系统提示（单条翻译和批量翻译共用，输出格式由用户消息指定）
+SYSTEM_PROMPT_JA = "你是专业的日语翻译专家，精通日本文化、网络用语、表情符号和日本艺人常用词汇。请将以下日语内容准确翻译成自然流畅的简体中文，保留原文的风格、情感和文化内涵。保留原文中的表情符号、标签和@提及。"
+SYSTEM_PROMPT_EN = "你是专业的英语翻译专家，精通英语文化、网络用语、表情符号和国际交流。请将以下英语内容准确翻译成自然流畅的简体中文，保留原文的风格、情感和文化内涵。保留原文中的表情符号、标签和@提及。"
+
+# 预先构建的系统消息，每次请求只需追加用户消息
+MESSAGES_JA = [{"role": "system", "content": SYSTEM_PROMPT_JA}]
+MESSAGES_EN = [{"role": "system", "content": SYSTEM_PROMPT_EN}]
+
+# 推文原文链接模板（用户名, 推文ID）
+_TWEET_URL = "https://twitter.com/%s/status/%s"
+
+# 免费翻译服务的请求地址模板（源语言, 目标语言, 文本）和请求头
+_FREE_TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single?client=gtx&sl=%s&tl=%s&dt=t&q=%s"
+_UA_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
+
+# ISO格式的日期时间（例如："2025-04-26T15:30:45"）
+_ISO_RE = re.compile(r'\d{4}-\d{2}-\d{2}T')
+
+# 日语字符（码位大于U+3000的字符），用于判断文本语言
+_JP_RE = re.compile('[\u3001-\U0010ffff]')
+
+@dataclass(slots=True)
+class Tweet:
+    """推文数据，API、缓存、无API抓取和模拟数据统一使用"""
+    id: str
+    full_text: str
+    created_at: datetime
+    extended_entities: dict = field(default_factory=dict)
+
+# 本轮运行的状态码（供 run_x_service 判断是否切换到无API模式）
+RUN_STATUS = EXIT_OK
+
+def configure(run_args):
+    """根据运行参数更新全局设置，命令行参数优先于配置文件"""
+    global args, X_USERNAME, TEST_MODE, MAX_TWEETS, CACHE_FILE, USER_ID_FILE, SINCE_ID_FILE
+    args = run_args
+    X_USERNAME = run_args.artist or config['SETTINGS']['X_USERNAME']
+    TEST_MODE = run_args.test or config['SETTINGS'].getboolean('TEST_MODE', fallback=True)
+    MAX_TWEETS = run_args.count
+    CACHE_FILE = f"cache_{X_USERNAME}_tweets.json"
+    USER_ID_FILE = f"cache_{X_USERNAME}_userid.txt"
+    SINCE_ID_FILE = f"cache_{X_USERNAME}_since_id.txt"
+    bind_mode_functions()
+
+def bind_mode_functions():
+    """根据是否为测试模式绑定翻译、发布和备用抓取函数，避免在每次调用时判断TEST_MODE"""
+    global translate_text_with_openai, post_to_weibo, get_fallback_tweets
+    if TEST_MODE:
+        translate_text_with_openai = translate_text_test
+        post_to_weibo = post_to_weibo_test
+        get_fallback_tweets = get_mock_tweets
+    else:
+        translate_text_with_openai = translate_text_real
+        post_to_weibo = post_to_weibo_real
+        get_fallback_tweets = get_tweets_without_api
 
 def load_processed_tweets():
-    """加载已处理过的推文ID列表"""
+    """加载已处理过的推文ID集合（仅在首次调用时读取文件）
+    
+    会将上次运行留下的追加日志合并到JSON文件中，之后新处理的推文ID只追加写入日志。
+    """
+    global _journal
+    if _journal is not None:
+        return _processed
+    
     if os.path.exists(PROCESSED_TWEETS_FILE):
         try:
-            with open(PROCESSED_TWEETS_FILE, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.error(f"无法解析 {PROCESSED_TWEETS_FILE} 文件")
-            return []
-    return []
+            with open(PROCESSED_TWEETS_FILE, 'rb') as f:
+                _processed.update(orjson.loads(f.read()))
+        except orjson.JSONDecodeError:
+            logger.error("无法解析 %s 文件", PROCESSED_TWEETS_FILE)
+    
+    # 合并追加日志并重写JSON文件
+    if os.path.exists(PROCESSED_JOURNAL_FILE):
+        with open(PROCESSED_JOURNAL_FILE, 'r') as f:
+            _processed.update(line.strip() for line in f if line.strip())
+        write_processed_tweets()
+    
+    _journal = open(PROCESSED_JOURNAL_FILE, 'w')
+    return _processed
+
+def write_processed_tweets():
+    """将已处理推文ID写入JSON文件（同步到磁盘后原子替换原文件，避免写入中途退出导致文件被清空）"""
+    write_file_atomic(PROCESSED_TWEETS_FILE, orjson.dumps(sorted(_processed)), fsync=True)
+
+def compact_processed_tweets():
+    """在一批推文处理完成后，将追加日志合并到JSON文件并清空日志"""
+    with _processed_lock:
+        if _journal is None or _journal.tell() == 0:
+            return
+        write_processed_tweets()
+        _journal.seek(0)
+        _journal.truncate()
+
+def get_safe_since_id(tweet_ids):
+    """根据一批推文ID计算下次请求使用的 since_id，没有数字ID时返回None
+    
+    since_id 只推进到早于最早一条未处理推文的已处理推文，发布失败的推文在下次请求时会被重新获取
+    （已处理的推文会在处理前被过滤掉）；没有这样的已处理推文时返回最早未处理推文的前一个ID。
+    """
+    numeric_ids = [int(tweet_id) for tweet_id in map(str, tweet_ids) if tweet_id.isdigit()]
+    pending = [tweet_id for tweet_id in numeric_ids if str(tweet_id) not in _processed]
+    before = min(pending) if pending else None
+    
+    processed_ids = [tweet_id for tweet_id in numeric_ids
+                     if str(tweet_id) in _processed and (before is None or tweet_id < before)]
+    if processed_ids:
+        return max(processed_ids)
+    if before is not None:
+        return before - 1
+    return None
+
+def load_since_id():
+    """返回请求X API时使用的 since_id
+    
+    优先读取按用户保存的记录文件；没有记录时只根据该用户自己的缓存文件中的推文推算，
+    不使用 processed_tweets.json（其中包含所有用户的推文ID），都没有时返回None。
+    """
+    if os.path.exists(SINCE_ID_FILE):
+        with open(SINCE_ID_FILE, 'r') as f:
+            since_id = f.read().strip()
+        if since_id.isdigit():
+            return int(since_id)
+    
+    try:
+        return get_safe_since_id(tweet['id'] for tweet in read_cache_file(CACHE_FILE)['tweets'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def save_since_id(tweets):
+    """根据本轮获取的推文记录下次请求使用的 since_id"""
+    since_id = get_safe_since_id(tweet.id for tweet in tweets)
+    if since_id is None:
+        return
+    
+    if os.path.exists(SINCE_ID_FILE):
+        current_since_id = load_since_id()
+        if current_since_id and current_since_id >= since_id:
+            return
+    
+    with open(SINCE_ID_FILE, 'w') as f:
+        f.write(str(since_id))
 
 def save_processed_tweet(tweet_id):
-    """保存已处理的推文ID"""
-    processed_tweets = load_processed_tweets()
-    if tweet_id not in processed_tweets:
-        processed_tweets.append(tweet_id)
-        with open(PROCESSED_TWEETS_FILE, 'w') as f:
-            json.dump(processed_tweets, f)
+    """保存已处理的推文ID（写入内存集合并追加到日志文件）"""
+    with _processed_lock:
+        if tweet_id in _processed:
+            return
+        _processed.add(tweet_id)
+        _journal.write(tweet_id + "\n")
+        _journal.flush()
             
+def read_cache_file(path):
+    """读取并解析缓存文件，文件修改时间未变时直接返回上次解析的结果"""
+    mtime = os.path.getmtime(path)
+    cached = _cache_file_data.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    with open(path, 'rb') as f:
+        cache_data = orjson.loads(f.read())
+    _cache_file_data[path] = (mtime, cache_data)
+    return cache_data
+
 def is_valid_cache():
-    """检查缓存是否有效"""
+    """检查缓存是否有效（根据文件修改时间判断，无需读取和解析缓存内容）"""
     if args.force:
         return False
         
-    if not os.path.exists(CACHE_FILE):
-        return False
-        
     try:
-        with open(CACHE_FILE, 'r') as f:
-            cache_data = json.load(f)
-            
-        cache_time = datetime.fromisoformat(cache_data['timestamp'])
-        current_time = datetime.now()
-        # 检查是否在缓存过期时间内
-        if (current_time - cache_time).total_seconds() < CACHE_EXPIRY * 60:
-            return True
-    except Exception as e:
-        logger.error(f"检查缓存时出错: {e}")
+        cache_age = time.time() - os.stat(CACHE_FILE).st_mtime
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.error("检查缓存时出错: %s", e)
+        return False
         
-    return False
+    # 检查是否在缓存过期时间内
+    return cache_age < CACHE_EXPIRY * 60
+
+def parse_cached_time(value):
+    """将缓存中的推文时间转换为datetime，兼容旧版本缓存中的ISO格式字符串"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return datetime.fromtimestamp(value, tz=timezone.utc)
 
 def load_tweets_from_cache():
     """从缓存加载推文"""
     try:
-        with open(CACHE_FILE, 'r') as f:
-            cache_data = json.load(f)
+        cache_data = read_cache_file(CACHE_FILE)
             
         # 从缓存创建推文对象
         tweets = []
         for tweet_data in cache_data['tweets']:
-            tweet = type('Tweet', (), {})()
-            tweet.id = tweet_data['id']
-            tweet.full_text = tweet_data['text']
-            tweet.created_at = datetime.fromisoformat(tweet_data['created_at'])
+            tweet = Tweet(
+                id=tweet_data['id'],
+                full_text=tweet_data['text'],
+                created_at=parse_cached_time(tweet_data['created_at'])
+            )
             
             # 添加媒体信息
-            tweet.extended_entities = {}
             if 'media' in tweet_data:
                 tweet.extended_entities['media'] = tweet_data['media']
                 
             tweets.append(tweet)
             
-        logger.info(f"从缓存加载了 {len(tweets)} 条推文")
+        logger.info("从缓存加载了 %s 条推文", len(tweets))
         return tweets
     except Exception as e:
-        logger.error(f"从缓存加载推文时出错: {e}")
+        logger.error("从缓存加载推文时出错: %s", e)
         return []
 
 def save_tweets_to_cache(tweets_data):
     """保存推文到缓存"""
     try:
         cache_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.now(),
             'tweets': tweets_data
         }
         
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        write_file_atomic(CACHE_FILE, orjson.dumps(cache_data, option=orjson.OPT_INDENT_2))
+        _cache_file_data.pop(CACHE_FILE, None)
             
-        logger.info(f"已将 {len(tweets_data)} 条推文保存到缓存")
+        logger.info("已将 %s 条推文保存到缓存", len(tweets_data))
     except Exception as e:
-        logger.error(f"保存推文到缓存时出错: {e}")
+        logger.error("保存推文到缓存时出错: %s", e)
 
+def get_rate_limit_reset(exc):
+    """从速率限制错误的响应头中读取可以再次请求的时间（Unix时间戳），没有相关响应头时返回None"""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    
+    reset = str(headers.get('x-rate-limit-reset', ''))
+    if reset.isdigit():
+        return int(reset)
+    retry_after = str(headers.get('retry-after', ''))
+    if retry_after.isdigit():
+        return time.time() + int(retry_after)
+    return None
+
+def wait_rate_limit(fallback):
+    """tenacity等待策略：错误带有速率限制重置时间时等待到重置时刻，否则使用 fallback 策略"""
+    def wait(retry_state):
+        reset_at = get_rate_limit_reset(retry_state.outcome.exception())
+        if reset_at is not None:
+            return max(0, reset_at - time.time())
+        return fallback(retry_state)
+    return wait
+
+def get_user_id():
+    """返回 X_USERNAME 对应的用户ID，依次使用内存缓存、本地文件和X API查找"""
+    if X_USERNAME in _user_ids:
+        return _user_ids[X_USERNAME]
+    
+    # 用户ID不会随时间变化，保存到本地文件后无需每次调用 get_user
+    if os.path.exists(USER_ID_FILE):
+        with open(USER_ID_FILE, 'r') as f:
+            cached_id = f.read().strip()
+        if cached_id.isdigit():
+            _user_ids[X_USERNAME] = int(cached_id)
+            return _user_ids[X_USERNAME]
+    
+    user = _x_client.get_user(username=X_USERNAME)
+    if not user.data:
+        return None
+    
+    user_id = user.data.id
+    logger.info("找到用户 ID: %s", user_id)
+    _user_ids[X_USERNAME] = user_id
+    with open(USER_ID_FILE, 'w') as f:
+        f.write(str(user_id))
+    return user_id
+
+def forget_user_id():
+    """删除缓存的用户ID，下次调用 get_user_id 时重新查找"""
+    _user_ids.pop(X_USERNAME, None)
+    if os.path.exists(USER_ID_FILE):
+        os.remove(USER_ID_FILE)
+
+def get_users_tweets(user_id, since_id):
+    """获取指定用户ID的推文，只请求比 since_id 更新的推文"""
+    return _x_client.get_users_tweets(
+        id=user_id,
+        since_id=since_id,
+        max_results=MAX_TWEETS,
+        tweet_fields=['created_at', 'text'],
+        expansions=['attachments.media_keys'],
+        media_fields=['type', 'url', 'preview_image_url', 'media_key']
+    )
+
+# 速率限制错误在函数内部处理（记录 _rate_limit_reset_at 并切换到无API方式），不会触发这里的重试，
+# 因此重试只需要普通的指数退避
 @retry(
     stop=stop_after_attempt(3), 
     wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -176,51 +418,65 @@ def save_tweets_to_cache(tweets_data):
 )
 def get_tweets_from_x():
     """从X获取指定用户的最新推文 (使用 X API v2 和 Bearer Token)，包含速率限制处理"""
+    global RUN_STATUS, _rate_limit_reset_at
+    
     # 如果缓存有效，直接从缓存加载
     if is_valid_cache():
         return load_tweets_from_cache()
     
+    # 距上次成功请求X API的时间过短时跳过，避免服务反复重启时耗尽速率限制
+    if os.path.exists(LAST_FETCH_FILE):
+        elapsed = time.time() - os.path.getmtime(LAST_FETCH_FILE)
+        if elapsed < MIN_FETCH_INTERVAL:
+            logger.info("距上次请求X API仅 %.0f 秒（最小间隔 %s 秒），跳过本次请求", elapsed, MIN_FETCH_INTERVAL)
+            return []
+    
+    # 速率限制重置之前不再请求X API，直接使用无API方式
+    if _rate_limit_reset_at and time.time() < _rate_limit_reset_at:
+        RUN_STATUS = EXIT_RATE_LIMITED
+        logger.info("X API速率限制将在 %s 重置，在此之前使用无API抓取方式", datetime.fromtimestamp(_rate_limit_reset_at).strftime('%H:%M:%S'))
+        return get_tweets_without_api()
+    
     # 尝试使用X API
     try:
         # 测试模式下，尝试调用真实的 X API v2，如果失败则使用模拟数据
         if TEST_MODE:
-            logger.info(f"测试模式：尝试从 X 获取 @{X_USERNAME} 的真实推文 (使用 Bearer Token)")
+            logger.info("测试模式：尝试从 X 获取 @%s 的真实推文 (使用 Bearer Token)", X_USERNAME)
         else:
-            logger.info(f"尝试使用X API获取 @{X_USERNAME} 的推文")
+            logger.info("尝试使用X API获取 @%s 的推文", X_USERNAME)
         
-        # 创建 v2 API 客户端，使用 Bearer Token
-        client = tweepy.Client(bearer_token=X_BEARER_TOKEN)
+        # 首先获取用户 ID（优先使用缓存的ID）
+        user_id = get_user_id()
         
-        # 首先获取用户 ID
-        user = client.get_user(username=X_USERNAME)
+        if not user_id:
+            logger.warning("未找到用户 @%s", X_USERNAME)
+            return get_fallback_tweets()
         
-        if not user.data:
-            logger.warning(f"未找到用户 @{X_USERNAME}")
-            if TEST_MODE:
-                return get_mock_tweets()
-            else:
-                # 切换到无API抓取方式
-                return get_tweets_without_api()
-                
-        user_id = user.data.id
-        logger.info(f"找到用户 ID: {user_id}")
-        
-        # 获取用户推文
-        tweets_response = client.get_users_tweets(
-            id=user_id,
-            max_results=MAX_TWEETS,
-            tweet_fields=['created_at', 'text'],
-            expansions=['attachments.media_keys'],
-            media_fields=['type', 'url', 'preview_image_url', 'media_key']
-        )
+        # 获取用户推文，只请求比已处理推文更新的推文
+        since_id = load_since_id()
+        try:
+            tweets_response = get_users_tweets(user_id, since_id)
+        except tweepy.NotFound:
+            # 缓存的用户ID已失效，重新查找后再试一次
+            logger.warning("用户ID %s 无效，重新查找 @%s 的用户ID", user_id, X_USERNAME)
+            forget_user_id()
+            user_id = get_user_id()
+            if not user_id:
+                logger.warning("未找到用户 @%s", X_USERNAME)
+                return get_fallback_tweets()
+            tweets_response = get_users_tweets(user_id, since_id)
+        
+        # 记录本次成功请求的时间（没有新推文时也要记录，否则服务追上最新推文后最小间隔限制不再生效）
+        os.makedirs(os.path.dirname(LAST_FETCH_FILE), exist_ok=True)
+        Path(LAST_FETCH_FILE).touch()
+        
+        if not tweets_response.data and since_id:
+            logger.info("没有比 %s 更新的推文", since_id)
+            return []
         
         if not tweets_response.data:
-            logger.warning(f"未找到用户推文")
-            if TEST_MODE:
-                return get_mock_tweets()
-            else:
-                # 切换到无API抓取方式
-                return get_tweets_without_api()
+            logger.warning("未找到用户推文")
+            return get_fallback_tweets()
         
         # 转换为自定义的推文对象，与原有流程兼容
         tweets = []
@@ -239,13 +495,12 @@ def get_tweets_from_x():
         
         for tweet_data in tweets_response.data:
             # 创建推文对象
-            tweet = type('Tweet', (), {})()
-            tweet.id = tweet_data.id
-            tweet.full_text = tweet_data.text
-            tweet.created_at = tweet_data.created_at
-            
-            # 处理媒体附件
-            tweet.extended_entities = {'media': []}
+            tweet = Tweet(
+                id=tweet_data.id,
+                full_text=tweet_data.text,
+                created_at=tweet_data.created_at,
+                extended_entities={'media': []}  # 处理媒体附件
+            )
             
             if hasattr(tweet_data, 'attachments') and hasattr(tweet_data.attachments, 'media_keys'):
                 for media_key in tweet_data.attachments.media_keys:
@@ -262,7 +517,7 @@ def get_tweets_from_x():
             tweet_cache = {
                 'id': tweet_data.id,
                 'text': tweet_data.text,
-                'created_at': tweet_data.created_at.isoformat()
+                'created_at': tweet_data.created_at.timestamp()  # 保存为Unix时间戳，读取时无需解析字符串
             }
             
             # 添加媒体信息到缓存
@@ -274,100 +529,84 @@ def get_tweets_from_x():
         # 保存到缓存
         save_tweets_to_cache(cache_data)
         
-        logger.info(f"成功从X API获取了 {len(tweets)} 条推文")
+        logger.info("成功从X API获取了 %s 条推文", len(tweets))
         return tweets
         
     except tweepy.TooManyRequests as e:
-        logger.warning(f"X API请求次数超过限制，切换到无API抓取方式: {e}")
+        RUN_STATUS = EXIT_RATE_LIMITED
+        _rate_limit_reset_at = get_rate_limit_reset(e)
+        logger.warning("X API请求次数超过限制，切换到无API抓取方式: %s", e)
         return get_tweets_without_api()
+    except tweepy.Unauthorized as e:
+        RUN_STATUS = EXIT_AUTH_FAILED
+        logger.error("X API认证失败: %s", e)
+        return get_fallback_tweets()
     except tweepy.TweepyException as e:
         if "429" in str(e):
-            logger.warning(f"X API请求次数超过限制，切换到无API抓取方式: {e}")
-            return get_tweets_without_api()
-        logger.error(f"X API请求失败: {e}")
-        if TEST_MODE:
-            return get_mock_tweets()
-        else:
+            RUN_STATUS = EXIT_RATE_LIMITED
+            _rate_limit_reset_at = get_rate_limit_reset(e)
+            logger.warning("X API请求次数超过限制，切换到无API抓取方式: %s", e)
             return get_tweets_without_api()
+        logger.error("X API请求失败: %s", e)
+        return get_fallback_tweets()
     except Exception as e:
-        logger.error(f"获取推文时出错: {e}")
-        logger.debug(traceback.format_exc())
-        if TEST_MODE:
-            return get_mock_tweets()
-        else:
-            # 切换到无API抓取方式
-            return get_tweets_without_api()
+        logger.error("获取推文时出错: %s", e)
+        logger.debug("异常详情", exc_info=True)
+        return get_fallback_tweets()
 
 def get_tweets_without_api():
-    """使用x_scraper.py无API方式获取推文"""
-    logger.info(f"使用无API方式获取 @{X_USERNAME} 的推文")
+    """使用x_scraper无API方式获取推文（在当前进程内调用）"""
+    logger.info("使用无API方式获取 @%s 的推文", X_USERNAME)
     
     try:
-        # 确保x_scraper.py存在
-        if not os.path.exists('x_scraper.py'):
-            logger.error("找不到x_scraper.py文件，无法使用无API方式")
-            return []
-        
-        # 构建命令参数
-        cmd = [
-            'python', 
-            'x_scraper.py', 
-            '--username', X_USERNAME,
-            '--count', str(MAX_TWEETS),
-            '--once',
-            '--force'  # 强制抓取，不使用缓存
-        ]
-        
-        # 执行命令
-        logger.info(f"执行命令: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            logger.error(f"无API抓取失败: {result.stderr}")
+        # 仅在需要时导入x_scraper，API模式下无需加载抓取相关的库
+        try:
+            import x_scraper
+        except ImportError as e:
+            logger.error("无法导入x_scraper，无法使用无API方式: %s", e)
             return []
         
-        # 检查是否生成了缓存文件
-        cache_file = f"cache_{X_USERNAME}_tweets.json"
-        if not os.path.exists(cache_file):
-            logger.error(f"未找到缓存文件 {cache_file}")
-            return []
+        # 无API模式下由抓取器保存推文原文到Windows系统
+        windows_path = args.windows_path if args.no_api else None
+        test = args.no_api and TEST_MODE
         
-        # 加载缓存文件
-        with open(cache_file, 'r') as f:
-            cache_data = json.load(f)
+        logger.info("调用无API抓取器抓取 @%s 的推文", X_USERNAME)
+        tweets_data = x_scraper.scrape_user(X_USERNAME, MAX_TWEETS, force=True, windows_path=windows_path, test=test)
         
-        if 'tweets' not in cache_data or not cache_data['tweets']:
-            logger.warning("缓存文件中没有推文数据")
+        if not tweets_data:
+            logger.error("无API抓取失败，未获取到推文")
             return []
         
         # 转换为主程序使用的格式
         tweets = []
-        for tweet_data in cache_data['tweets']:
-            # 创建推文对象
-            tweet = type('Tweet', (), {})()
-            tweet.id = tweet_data['id']
-            tweet.full_text = tweet_data['content']
-            
+        for tweet_data in tweets_data:
             # 处理日期
             try:
                 if 'created_at' in tweet_data and tweet_data['created_at']:
                     # 尝试解析ISO格式
-                    if 'T' in tweet_data['created_at']:
-                        tweet.created_at = datetime.fromisoformat(tweet_data['created_at'].replace('Z', '+00:00'))
+                    if _ISO_RE.match(tweet_data['created_at']):
+                        created_at = datetime.fromisoformat(tweet_data['created_at'].replace('Z', '+00:00'))
                     # 尝试解析Nitter格式（例如："Apr 26, 2025, 15:30:45"）
                     else:
                         try:
-                            tweet.created_at = datetime.strptime(tweet_data['created_at'], "%b %d, %Y, %H:%M:%S")
+                            created_at = datetime.strptime(tweet_data['created_at'], "%b %d, %Y, %H:%M:%S")
                         except ValueError:
-                            tweet.created_at = datetime.now()
+                            created_at = datetime.now()
                 else:
-                    tweet.created_at = datetime.now()
+                    created_at = datetime.now()
             except Exception as e:
-                logger.warning(f"解析日期失败: {e}，使用当前时间")
-                tweet.created_at = datetime.now()
+                logger.warning("解析日期失败: %s，使用当前时间", e)
+                created_at = datetime.now()
+            
+            # 创建推文对象
+            tweet = Tweet(
+                id=tweet_data['id'],
+                full_text=tweet_data['content'],
+                created_at=created_at,
+                extended_entities={'media': []}
+            )
             
             # 处理媒体
-            tweet.extended_entities = {'media': []}
             if 'media' in tweet_data:
                 for media in tweet_data['media']:
                     if 'type' in media and media['type'] == 'photo' and 'url' in media:
@@ -378,192 +617,259 @@ def get_tweets_without_api():
             
             tweets.append(tweet)
         
-        logger.info(f"成功从无API方式获取了 {len(tweets)} 条推文")
+        logger.info("成功从无API方式获取了 %s 条推文", len(tweets))
         return tweets
         
     except Exception as e:
-        logger.error(f"无API获取推文失败: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("无API获取推文失败: %s", e)
+        logger.debug("异常详情", exc_info=True)
         return []
 
+def _mock_tweet(id, text, has_media=False):
+    """创建一条模拟推文"""
+    media = []
+    # 模拟媒体附件
+    if has_media:
+        media.append({
+            'type': 'photo',
+            'media_url': 'https://dummyimage.com/600x400/000/fff&text=Mock+Image'
+        })
+    return Tweet(
+        id=id,
+        full_text=text,
+        created_at=datetime.now() - timedelta(hours=random.randint(1, 24)),
+        extended_entities={'media': media}
+    )
+
+# 模拟的推文数据，导入时生成一次
+_MOCK_TWEETS = (
+    _mock_tweet("1", "This is a test tweet from our mock data. #testing", True),
+    _mock_tweet("2", "Another mock tweet to demonstrate the translation functionality."),
+    _mock_tweet("3", "今日も撮影楽しかったですー！みんなありがとう〜 #日本語ツイート", True)
+)
+
 def get_mock_tweets():
-    """生成模拟的推文数据"""
-    logger.info("生成模拟推文数据")
-    # 创建模拟的推文对象
-    class MockTweet:
-        def __init__(self, id, text, has_media=False):
-            self.id = id
-            self.full_text = text
-            self.created_at = datetime.now() - timedelta(hours=random.randint(1, 24))
-            # 模拟媒体附件
-            self.extended_entities = {'media': []}
-            if has_media:
-                self.extended_entities['media'].append({
-                    'type': 'photo',
-                    'media_url': 'https://dummyimage.com/600x400/000/fff&text=Mock+Image'
-                })
-    
-    # 返回一些模拟的推文
-    return [
-        MockTweet("1", "This is a test tweet from our mock data. #testing", True),
-        MockTweet("2", "Another mock tweet to demonstrate the translation functionality."),
-        MockTweet("3", "今日も撮影楽しかったですー！みんなありがとう〜 #日本語ツイート", True)
-    ]
+    """返回模拟的推文数据（新列表，调用方可以排序）"""
+    logger.info("使用模拟推文数据")
+    return list(_MOCK_TWEETS)
+
+def is_mainly_japanese(text):
+    """简单检测文本是否主要为日语：超过10%的字符是日语字符时认为是日语文本"""
+    jp_chars = len(_JP_RE.findall(text))
+    return jp_chars > len(text) * 0.1
 
 def translate_with_free_api(text, source_lang='auto', target_lang='zh-CN'):
     """使用免费API进行翻译，不需要API密钥"""
-    logger.info(f"使用备用翻译服务 (Free API)")
+    logger.info("使用备用翻译服务 (Free API)")
     try:
         # 判断是主要为日语还是英语
-        def is_mainly_japanese(text):
-            jp_chars = len([c for c in text if ord(c) > 0x3000])
-            return jp_chars > len(text) * 0.1
-            
         is_jp = is_mainly_japanese(text)
         source_lang = 'ja' if is_jp else 'en'
         
         # 使用免费翻译服务
-        url = f"https://translate.googleapis.com/translate_a/single?client=gtx&sl={source_lang}&tl={target_lang}&dt=t&q={html.escape(text)}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        }
+        url = _FREE_TRANSLATE_URL % (source_lang, target_lang, html.escape(text))
         
-        response = requests.get(url, headers=headers)
+        response = _session.get(url, headers=_UA_HEADERS)
         if response.status_code == 200:
             # 解析JSON响应
             result = response.json()
             translated_text = ''.join([item[0] for item in result[0] if item[0]])
             return translated_text
         else:
-            logger.error(f"备用翻译服务请求失败，状态码: {response.status_code}")
+            logger.error("备用翻译服务请求失败，状态码: %s", response.status_code)
             return f"[翻译失败] {text[:50]}..."
     except Exception as e:
-        logger.error(f"备用翻译服务出错: {e}")
+        logger.error("备用翻译服务出错: %s", e)
         return f"[翻译失败] {text[:50]}..."
 
-@retry(
-    stop=stop_after_attempt(3), 
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type((openai.RateLimitError, openai.APITimeoutError))
-)
-def translate_text_with_openai(text):
-    """使用OpenAI API翻译文本，如果配额不足则使用备用翻译服务"""
-    
-    # 判断文本是否主要为日语
-    def is_mainly_japanese(text):
-        # 简单检测文本是否包含日语字符
-        jp_chars = len([c for c in text if ord(c) > 0x3000])
-        return jp_chars > len(text) * 0.1  # 如果超过10%的字符是日语，认为是日语文本
-    
+def translate_text_test(text):
+    """测试模式下翻译文本：随机调用真实的 OpenAI API 或返回模拟翻译"""
     is_jp = is_mainly_japanese(text)
     
     # 测试模式下，尝试调用真实的 OpenAI API
-    if TEST_MODE:
-        try:
-            logger.info(f"测试模式：尝试使用 OpenAI API 翻译文本")
-            # 设置OpenAI API密钥
-            openai.api_key = OPENAI_API_KEY
+    try:
+        logger.info("测试模式：尝试使用 OpenAI API 翻译文本")
+        # 为测试模式提供更简单的提示，减少API消耗
+        if random.random() < 0.5:  # 50%的概率调用真实API
+            # 调用API进行翻译
+            response = _openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "请将输入文本准确翻译成简体中文。"},
+                    {"role": "user", "content": text}
+                ],
+                max_tokens=150
+            )
             
-            # 为测试模式提供更简单的提示，减少API消耗
-            if random.random() < 0.5:  # 50%的概率调用真实API
-                # 调用API进行翻译
-                response = openai.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "请将输入文本准确翻译成简体中文。"},
-                        {"role": "user", "content": text}
-                    ],
-                    max_tokens=150
-                )
-                
-                # 提取翻译结果
-                translated_text = response.choices[0].message.content.strip()
-                logger.info(f"测试模式：翻译完成")
-                return translated_text
-            else:
-                logger.info(f"测试模式：跳过API调用，返回模拟翻译")
-                if is_jp:
-                    return f"[测试翻译-日语] {text[:30]}..."
-                else:
-                    return f"[测试翻译-英语] {text[:30]}..."
-        
-        except openai.RateLimitError as e:
-            logger.error(f"测试模式：OpenAI API速率限制错误: {e}")
-            if USE_BACKUP_TRANSLATOR:
-                logger.info("切换到备用翻译服务")
-                return translate_with_free_api(text)
-            return f"[测试翻译失败] {text[:30]}..."
-        except openai.InsufficientQuotaError as e:
-            logger.error(f"测试模式：OpenAI API配额不足: {e}")
-            if USE_BACKUP_TRANSLATOR:
-                logger.info("切换到备用翻译服务")
-                return translate_with_free_api(text)
-            return f"[测试翻译失败] {text[:30]}..."
-        except Exception as e:
-            logger.error(f"测试模式：翻译失败，错误: {e}，返回模拟翻译")
+            # 提取翻译结果
+            translated_text = response.choices[0].message.content.strip()
+            logger.info("测试模式：翻译完成")
+            return translated_text
+        else:
+            logger.info("测试模式：跳过API调用，返回模拟翻译")
             if is_jp:
                 return f"[测试翻译-日语] {text[:30]}..."
             else:
                 return f"[测试翻译-英语] {text[:30]}..."
     
-    try:
-        # 设置OpenAI API密钥
-        openai.api_key = OPENAI_API_KEY
-        
-        # 针对日语和英语使用不同的提示
+    except openai.RateLimitError as e:
+        logger.error("测试模式：OpenAI API速率限制错误: %s", e)
+        if USE_BACKUP_TRANSLATOR:
+            logger.info("切换到备用翻译服务")
+            return translate_with_free_api(text)
+        return f"[测试翻译失败] {text[:30]}..."
+    except openai.InsufficientQuotaError as e:
+        logger.error("测试模式：OpenAI API配额不足: %s", e)
+        if USE_BACKUP_TRANSLATOR:
+            logger.info("切换到备用翻译服务")
+            return translate_with_free_api(text)
+        return f"[测试翻译失败] {text[:30]}..."
+    except Exception as e:
+        logger.error("测试模式：翻译失败，错误: %s，返回模拟翻译", e)
         if is_jp:
-            system_prompt = "你是专业的日语翻译专家，精通日本文化、网络用语、表情符号和日本艺人常用词汇。请将以下日语内容准确翻译成自然流畅的简体中文，保留原文的风格、情感和文化内涵。保留原文中的表情符号、标签和@提及。"
+            return f"[测试翻译-日语] {text[:30]}..."
         else:
-            system_prompt = "你是专业的英语翻译专家，精通英语文化、网络用语、表情符号和国际交流。请将以下英语内容准确翻译成自然流畅的简体中文，保留原文的风格、情感和文化内涵。保留原文中的表情符号、标签和@提及。"
+            return f"[测试翻译-英语] {text[:30]}..."
+
+@retry(
+    stop=stop_after_attempt(3), 
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    retry=retry_if_exception_type((openai.RateLimitError, openai.APITimeoutError))
+)
+def translate_text_real(text):
+    """使用OpenAI API翻译文本，如果配额不足则使用备用翻译服务"""
+    is_jp = is_mainly_japanese(text)
+    
+    try:
+        # 针对日语和英语使用不同的提示
+        system_messages = MESSAGES_JA if is_jp else MESSAGES_EN
         
         # 调用API进行翻译
-        response = openai.chat.completions.create(
+        response = _openai_client.chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"请翻译以下文本：\n\n{text}"}
-            ]
+            messages=system_messages + [{"role": "user", "content": f"请翻译以下文本：\n\n{text}"}]
         )
         
         # 提取翻译结果
         translated_text = response.choices[0].message.content.strip()
-        logger.info(f"翻译完成")
+        logger.info("翻译完成")
         return translated_text
     
     except openai.RateLimitError as e:
-        logger.error(f"OpenAI API速率限制错误: {e}")
+        logger.error("OpenAI API速率限制错误: %s", e)
         if USE_BACKUP_TRANSLATOR:
             logger.info("切换到备用翻译服务")
             return translate_with_free_api(text)
         return ""
     except openai.InsufficientQuotaError as e:
-        logger.error(f"OpenAI API配额不足: {e}")
+        logger.error("OpenAI API配额不足: %s", e)
         if USE_BACKUP_TRANSLATOR:
             logger.info("切换到备用翻译服务")
             return translate_with_free_api(text)
         return ""
     except Exception as e:
-        logger.error(f"翻译时出错: {e}")
-        logger.error(traceback.format_exc())
+        logger.error("翻译时出错: %s", e, exc_info=True)
         if USE_BACKUP_TRANSLATOR:
             logger.info("尝试使用备用翻译服务")
             return translate_with_free_api(text)
         return ""
 
+def translate_texts_each(texts):
+    """并发地逐条翻译多条文本，返回与输入顺序一致的译文列表"""
+    if len(texts) <= 1:
+        return [translate_text_with_openai(text) for text in texts]
+    
+    with ThreadPoolExecutor(max_workers=MAX_TRANSLATE_WORKERS) as pool:
+        return list(pool.map(translate_text_with_openai, texts))
+
+def translate_texts_batch(texts):
+    """批量翻译多条文本，返回与输入顺序一致的译文列表
+    
+    日语和英语推文分成两组，每组使用对应语言的提示发送一次请求；测试模式或只有一条文本时逐条翻译。
+    """
+    if TEST_MODE or len(texts) <= 1:
+        return translate_texts_each(texts)
+    
+    # 按语言分组，记录每条文本在原列表中的位置
+    groups = {True: [], False: []}
+    for i, text in enumerate(texts):
+        groups[is_mainly_japanese(text)].append(i)
+    
+    translations = [None] * len(texts)
+    for is_jp, indexes in groups.items():
+        if not indexes:
+            continue
+        system_messages = MESSAGES_JA if is_jp else MESSAGES_EN
+        group_translations = translate_language_batch([texts[i] for i in indexes], system_messages)
+        for i, translated_text in zip(indexes, group_translations):
+            translations[i] = translated_text
+    
+    return translations
+
+def translate_language_batch(texts, system_messages):
+    """使用一次OpenAI请求翻译同一语言的多条文本，结果无法解析时回退到逐条翻译"""
+    if len(texts) <= 1:
+        return translate_texts_each(texts)
+    
+    try:
+        user_prompt = f"请将以下 {len(texts)} 条推文分别翻译成简体中文，严格只返回长度为 {len(texts)} 的JSON字符串数组，顺序与输入一致：\n\n{orjson.dumps(texts).decode()}"
+        
+        response = _openai_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=system_messages + [{"role": "user", "content": user_prompt}]
+        )
+        
+        translations = orjson.loads(response.choices[0].message.content.strip())
+        if not isinstance(translations, list) or len(translations) != len(texts):
+            raise ValueError(f"返回结果数量不匹配，期望 {len(texts)} 条")
+        
+    except Exception as e:
+        logger.warning("批量翻译失败，改为逐条翻译: %s", e)
+        return translate_texts_each(texts)
+    
+    # 只接受非空字符串，null、数字等无效结果改为逐条翻译，避免把"None"之类的文本发布出去
+    results = [translated.strip() if isinstance(translated, str) else "" for translated in translations]
+    invalid = [i for i, translated in enumerate(results) if not translated]
+    if invalid:
+        logger.warning("批量翻译中有 %s 条结果无效，改为逐条翻译", len(invalid))
+        for i, translated in zip(invalid, translate_texts_each([texts[i] for i in invalid])):
+            results[i] = translated
+    
+    logger.info("批量翻译完成，共 %s 条", len(texts))
+    return results
+
+def download_image(url):
+    """下载图片到内存，失败或图片过大时返回None"""
+    try:
+        # 先读取响应头，图片过大时不下载响应体
+        with _session.get(url, timeout=30, stream=True) as response:
+            if response.status_code != 200:
+                logger.error("下载图片失败: %s", url)
+                return None
+            
+            size = int(response.headers.get('content-length', 0))
+            if size > MAX_IMAGE_BYTES:
+                logger.warning("图片大小 %s 字节超过上限 %s 字节，跳过: %s", size, MAX_IMAGE_BYTES, url)
+                return None
+            
+            return response.content
+    except Exception as e:
+        logger.error("下载图片时出错: %s", e)
+    return None
+
+def post_to_weibo_test(text, media_urls=None):
+    """测试模式下发布到微博：只打印不实际发布"""
+    logger.info("测试模式：将发布到微博的内容: %s", text)
+    if media_urls:
+        logger.info("测试模式：包含 %s 张图片", len(media_urls))
+    return True
+
 @retry(
     stop=stop_after_attempt(3), 
-    wait=wait_exponential(multiplier=1, min=4, max=30)
+    wait=wait_rate_limit(wait_exponential(multiplier=1, min=4, max=30))
 )
-def post_to_weibo(text, media_urls=None):
+def post_to_weibo_real(text, media_urls=None):
     """发布内容到微博"""
-    # 测试模式下，只打印不实际发布
-    if TEST_MODE:
-        logger.info(f"测试模式：将发布到微博的内容: {text}")
-        if media_urls:
-            logger.info(f"测试模式：包含 {len(media_urls)} 张图片")
-        return True
-    
     try:
         # 创建微博客户端
         client = WeiboClient(
@@ -575,29 +881,21 @@ def post_to_weibo(text, media_urls=None):
         # 如果有媒体文件，先下载并上传
         pic_ids = []
         if media_urls and len(media_urls) > 0:
-            for i, url in enumerate(media_urls[:9]):  # 微博最多支持9张图片
+            # 并发下载图片，微博最多支持9张图片
+            with ThreadPoolExecutor(max_workers=9) as pool:
+                images = list(pool.map(download_image, media_urls[:9]))
+            
+            for i, image in enumerate(images):
+                if image is None:
+                    continue
                 try:
-                    # 下载图片
-                    local_filename = f"temp_image_{i}.jpg"
-                    response = requests.get(url, stream=True)
-                    if response.status_code == 200:
-                        with open(local_filename, 'wb') as f:
-                            for chunk in response.iter_content(1024):
-                                f.write(chunk)
-                        
-                        # 上传图片到微博
-                        with open(local_filename, 'rb') as f:
-                            pic_upload_response = client.upload.pic.upload(pic=f)
-                            if 'pic_id' in pic_upload_response:
-                                pic_ids.append(pic_upload_response['pic_id'])
-                                logger.info(f"图片 {i+1} 上传成功")
-                        
-                        # 删除临时文件
-                        os.remove(local_filename)
-                    else:
-                        logger.error(f"下载图片失败: {url}")
+                    # 直接从内存上传图片到微博
+                    pic_upload_response = client.upload.pic.upload(pic=io.BytesIO(image))
+                    if 'pic_id' in pic_upload_response:
+                        pic_ids.append(pic_upload_response['pic_id'])
+                        logger.info("图片 %s 上传成功", i+1)
                 except Exception as e:
-                    logger.error(f"处理图片时出错: {e}")
+                    logger.error("处理图片时出错: %s", e)
         
         # 发布微博
         if pic_ids:
@@ -606,14 +904,14 @@ def post_to_weibo(text, media_urls=None):
             response = client.statuses.update.post(status=text)
         
         if 'id' in response:
-            logger.info(f"已发布到微博，微博ID: {response['id']}")
+            logger.info("已发布到微博，微博ID: %s", response['id'])
             return True
         else:
-            logger.error(f"发布到微博失败，响应: {response}")
+            logger.error("发布到微博失败，响应: %s", response)
             return False
             
     except Exception as e:
-        logger.error(f"发布到微博时出错: {e}")
+        logger.error("发布到微博时出错: %s", e)
         raise  # 重新抛出异常，触发重试机制
 
 def save_tweets_to_windows(tweets, username):
@@ -623,23 +921,11 @@ def save_tweets_to_windows(tweets, username):
         return False
     
     try:
-        # 检查是否在WSL环境中
-        is_wsl = "microsoft" in platform.uname().release.lower()
-        
-        if not is_wsl:
+        if not is_wsl():
             logger.warning("当前不是WSL环境，无法使用/mnt路径保存到Windows，尝试直接保存")
             windows_path = args.windows_path
         else:
-            # 处理Windows路径
-            # 如果提供的是Windows格式路径（如C:/Users/...），将其转换为WSL路径格式
-            if ':' in args.windows_path:
-                # 从Windows路径格式（如C:/Users/username/Documents）转换为WSL格式
-                drive_letter = args.windows_path[0].lower()
-                path_part = args.windows_path[2:].replace('\\', '/')
-                windows_path = f"/mnt/{drive_letter}/{path_part}"
-            else:
-                # 已经是WSL路径格式
-                windows_path = args.windows_path
+            windows_path = to_wsl_path(args.windows_path)
         
         # 创建目标目录（如果不存在）
         os.makedirs(windows_path, exist_ok=True)
@@ -655,8 +941,8 @@ def save_tweets_to_windows(tweets, username):
             tweet_dict = {
                 'id': str(tweet.id),
                 'text': tweet.full_text,
-                'created_at': tweet.created_at.isoformat(),
-                'url': f"https://twitter.com/{username}/status/{tweet.id}"
+                'created_at': tweet.created_at,
+                'url': _TWEET_URL % (username, tweet.id)
             }
             
             # 添加媒体信息（如果有）
@@ -672,31 +958,71 @@ def save_tweets_to_windows(tweets, username):
             tweets_json.append(tweet_dict)
         
         # 保存推文到文件
-        with open(full_path, 'w', encoding='utf-8') as f:
-            json.dump(tweets_json, f, ensure_ascii=False, indent=2)
+        write_file_atomic(full_path, orjson.dumps(tweets_json, option=orjson.OPT_INDENT_2))
             
-        logger.info(f"已将 {len(tweets_json)} 条推文原文保存到Windows系统: {full_path}")
+        logger.info("已将 %s 条推文原文保存到Windows系统: %s", len(tweets_json), full_path)
         return True
     except Exception as e:
-        logger.error(f"保存推文到Windows系统时出错: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("保存推文到Windows系统时出错: %s", e)
+        logger.debug("异常详情", exc_info=True)
         return False
 
+def process_one_tweet(tweet, translated_text):
+    """发布单条已翻译的推文到微博，成功后记录推文ID"""
+    try:
+        # 提取媒体链接（如果有）
+        media_urls = []
+        if 'media' in tweet.extended_entities:
+            for media in tweet.extended_entities['media']:
+                if media['type'] == 'photo':
+                    media_urls.append(media['media_url'])
+        
+        if translated_text:
+            # 添加原始链接
+            tweet_url = _TWEET_URL % (X_USERNAME, tweet.id)
+            post_text = f"{translated_text}\n\n原文链接: {tweet_url}"
+            
+            # 发布到微博
+            if post_to_weibo(post_text, media_urls):
+                # 保存已处理的推文ID
+                save_processed_tweet(str(tweet.id))
+                logger.info("成功处理推文ID %s", tweet.id)
+                
+                # 添加随机延迟，避免频繁发布
+                if not TEST_MODE and not args.once:
+                    delay = random.randint(5, 15)
+                    logger.info("等待 %s 秒后继续...", delay)
+                    time.sleep(delay)
+            else:
+                logger.error("发布到微博失败，推文ID %s", tweet.id)
+        else:
+            logger.error("翻译失败，跳过推文ID %s", tweet.id)
+        
+    except Exception as e:
+        logger.error("处理推文 %s 时出错: %s", tweet.id, e)
+
 def process_tweets():
     """处理获取到的推文"""
-    processed_tweets = load_processed_tweets()
+    global RUN_STATUS
+    load_processed_tweets()
+    tweets = []
     
     try:
         # 获取推文
         if TEST_MODE and random.random() < 0.2:  # 20%概率测试无API模式
             logger.info("测试模式: 随机使用模拟数据")
             tweets = get_mock_tweets()
+        elif args.no_api:
+            tweets = get_tweets_without_api()
+            # 抓取器只在抓取失败时返回空列表（没有新推文时也会返回已抓取的推文），记为本轮失败
+            if not tweets:
+                RUN_STATUS = EXIT_ERROR
         else:
             try:
                 # 首先尝试使用API获取
                 tweets = get_tweets_from_x()
             except Exception as e:
-                logger.error(f"使用API获取推文失败: {e}")
+                logger.error("使用API获取推文失败: %s", e)
                 # 如果API获取失败，尝试无API方式
                 logger.info("尝试使用无API方式获取推文...")
                 tweets = get_tweets_without_api()
@@ -705,96 +1031,101 @@ def process_tweets():
             logger.warning("未获取到任何推文")
             return
             
-        logger.info(f"获取到 {len(tweets)} 条推文")
+        logger.info("获取到 %s 条推文", len(tweets))
         
         # 如果指定了Windows保存路径，保存原始推文到Windows系统
-        if args.windows_path:
+        # （无API模式下抓取器已经保存过推文原文，不再重复序列化和写入）
+        if args.windows_path and not args.no_api:
             save_tweets_to_windows(tweets, X_USERNAME)
         
         # 按照时间升序排序
         try:
             tweets.sort(key=lambda x: x.created_at)
         except Exception as e:
-            logger.warning(f"无法按时间排序推文: {e}")
+            logger.warning("无法按时间排序推文: %s", e)
         
         # 只处理未处理过的新推文
-        new_tweets = []
-        for tweet in tweets:
-            if str(tweet.id) not in processed_tweets:
-                new_tweets.append(tweet)
+        new_tweets = [tweet for tweet in tweets if str(tweet.id) not in _processed]
                 
         if not new_tweets:
             logger.info("没有新的推文需要处理")
             return
             
-        logger.info(f"有 {len(new_tweets)} 条新推文需要处理")
+        logger.info("有 %s 条新推文需要处理", len(new_tweets))
         
+        # 跳过转发的推文
+        original_tweets = []
         for tweet in new_tweets:
-            try:
-                # 提取推文文本
-                tweet_text = tweet.full_text
-                
-                # 跳过转发的推文
-                if tweet_text.startswith('RT @'):
-                    logger.info(f"跳过转发推文: {tweet.id}")
-                    save_processed_tweet(str(tweet.id))
-                    continue
-                
-                # 提取媒体链接（如果有）
-                media_urls = []
-                if 'media' in tweet.extended_entities:
-                    for media in tweet.extended_entities['media']:
-                        if media['type'] == 'photo':
-                            media_urls.append(media['media_url'])
-                
-                # 翻译推文文本
-                translated_text = translate_text_with_openai(tweet_text)
-                
-                if translated_text:
-                    # 添加原始链接
-                    tweet_url = f"https://twitter.com/{X_USERNAME}/status/{tweet.id}"
-                    post_text = f"{translated_text}\n\n原文链接: {tweet_url}"
-                    
-                    # 发布到微博
-                    if post_to_weibo(post_text, media_urls):
-                        # 保存已处理的推文ID
-                        save_processed_tweet(str(tweet.id))
-                        logger.info(f"成功处理推文ID {tweet.id}")
-                        
-                        # 添加随机延迟，避免频繁发布
-                        if not TEST_MODE and not args.once:
-                            delay = random.randint(5, 15)
-                            logger.info(f"等待 {delay} 秒后继续...")
-                            time.sleep(delay)
-                    else:
-                        logger.error(f"发布到微博失败，推文ID {tweet.id}")
-                else:
-                    logger.error(f"翻译失败，跳过推文ID {tweet.id}")
-                
-            except Exception as e:
-                logger.error(f"处理推文 {tweet.id} 时出错: {e}")
+            if tweet.full_text.startswith('RT @'):
+                logger.info("跳过转发推文: %s", tweet.id)
+                save_processed_tweet(str(tweet.id))
+            else:
+                original_tweets.append(tweet)
+        
+        # 一次请求批量翻译所有推文文本
+        translations = translate_texts_batch([tweet.full_text for tweet in original_tweets])
+        
+        # 按时间顺序逐条发布，发布之间的等待才能控制微博的发布间隔
+        # （图片下载和翻译在各自的步骤中并发进行）
+        for tweet, translated_text in zip(original_tweets, translations):
+            process_one_tweet(tweet, translated_text)
+
+    except Exception as e:
+        logger.error("处理推文时出错: %s", e)
+        logger.debug("异常详情", exc_info=True)
+    finally:
+        compact_processed_tweets()
+        save_since_id(tweets or [])
+
+# 使用默认参数初始化，实际运行前会重新配置
+configure(parser.parse_args([]))
 
+def run(run_args):
+    """执行一轮推文抓取、翻译和发布，供 run_x_service 在进程内直接调用
+    
+    返回状态码：EXIT_OK、EXIT_RATE_LIMITED、EXIT_AUTH_FAILED 或 EXIT_ERROR
+    """
+    global RUN_STATUS
+    configure(run_args)
+    RUN_STATUS = EXIT_OK
+    
+    try:
+        process_tweets()
     except Exception as e:
-        logger.error(f"处理推文时出错: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("运行推文处理器时出错: %s", e)
+        logger.debug("异常详情", exc_info=True)
+        return EXIT_ERROR
+    
+    return RUN_STATUS
 
 if __name__ == "__main__":
-    logger.info(f"开始运行推文抓取和发布服务 {'(测试模式)' if TEST_MODE else ''}")
-    logger.info(f"目标用户: @{X_USERNAME}")
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("tweet_to_weibo.log"),
+            logging.StreamHandler()
+        ]
+    )
+    configure(parser.parse_args())
+    logger.info("开始运行推文抓取和发布服务 %s", '(测试模式)' if TEST_MODE else '')
+    logger.info("目标用户: @%s", X_USERNAME)
     if USE_BACKUP_TRANSLATOR:
-        logger.info(f"已启用备用翻译服务: {BACKUP_TRANSLATOR}")
+        logger.info("已启用备用翻译服务: %s", BACKUP_TRANSLATOR)
     
     # 测试模式下或单次运行模式
     if TEST_MODE or args.once:
-        process_tweets()
+        status = run(args)
         logger.info("处理完成")
+        sys.exit(status)
     else:
         # 正常模式下定期执行
         try:
             while True:
                 process_tweets()
                 delay = CACHE_EXPIRY * 60  # 转换为秒
-                logger.info(f"休眠 {CACHE_EXPIRY} 分钟后再次检查...")
+                logger.info("休眠 %s 分钟后再次检查...", CACHE_EXPIRY)
                 time.sleep(delay)
         except KeyboardInterrupt:
             logger.info("服务已手动停止") 
\ No newline at end of file
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+# WSL环境检测和Windows路径转换，tweet_to_weibo.py和x_scraper.py共用
+
+import re
+import platform
+from functools import lru_cache
+
+# Windows格式路径（如C:/Users/... 或 C:\Users\...），分组为盘符和其余部分
+_WIN_PATH_RE = re.compile(r'^([A-Za-z]):[\\/]?(.*)$')
+
+@lru_cache(maxsize=1)
+def is_wsl():
+    """检查是否在WSL环境中（结果在进程内不会变化，只检查一次）"""
+    return "microsoft" in platform.uname().release.lower()
+
+@lru_cache(maxsize=8)
+def to_wsl_path(windows_path):
+    """将Windows格式路径（如C:/Users/...）转换为WSL路径格式（如/mnt/c/Users/...），已经是WSL路径时原样返回"""
+    match = _WIN_PATH_RE.match(windows_path)
+    if match:
+        return f"/mnt/{match.group(1).lower()}/{match.group(2).replace(chr(92), '/')}"
+    return windows_path
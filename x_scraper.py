@@ -1,38 +1,37 @@
 #!/usr/bin/env python3
 
-# 使用requests-html抓取X（Twitter）推文
+# 通过Nitter抓取X（Twitter）推文（httpx请求，selectolax解析）
 # 不需要API，避开API限制问题
 
 import os
-import json
 import time
+import asyncio
+import atexit
+import hashlib
 import logging
 import argparse
 import datetime
 import sys
 import random
-import platform
 from pathlib import Path
 from datetime import datetime, timedelta
-from requests_html import HTMLSession
+import httpx
+import orjson
+import msgpack
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from selectolax.lexbor import LexborHTMLParser
 from urllib.parse import urljoin
+from wsl_path import is_wsl, to_wsl_path
+from file_utils import write_file_atomic
 import re
-import traceback
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("x_scraper.log"),
-        logging.StreamHandler()
-    ]
-)
+
+# 日志处理器由入口脚本统一配置，避免被其他脚本导入时重复输出
 logger = logging.getLogger("XScraper")
 
-# 解析命令行参数
-parser = argparse.ArgumentParser(description='使用requests-html抓取X推文，无需API')
-parser.add_argument('--username', type=str, default='sasakirico', help='要抓取的X用户名，不包含@符号')
+# 命令行参数定义（作为脚本运行时解析，被其他模块调用时由调用方传入）
+parser = argparse.ArgumentParser(description='通过Nitter抓取X推文，无需API')
+parser.add_argument('--username', type=str, default='sasakirico', help='要抓取的X用户名，不包含@符号，多个用户名用逗号分隔')
 parser.add_argument('--count', type=int, default=10, help='每次抓取的最大推文数量')
 parser.add_argument('--interval', type=int, default=10, help='检查间隔（分钟）')
 parser.add_argument('--once', action='store_true', help='仅运行一次，不循环检查')
@@ -40,17 +39,27 @@ parser.add_argument('--output', type=str, default='scraped_tweets.json', help='
 parser.add_argument('--force', action='store_true', help='强制抓取，忽略缓存')
 parser.add_argument('--windows-path', type=str, help='Windows系统保存路径，如C:/Users/username/Documents')
 parser.add_argument('--test', action='store_true', help='测试模式，使用模拟数据测试Windows保存功能')
-args = parser.parse_args()
+parser.add_argument('--render', action='store_true', help='Nitter实例都不可用时直接抓取X网站（需要requests-html渲染JavaScript）')
 
-# 设置参数
-USERNAME = args.username
-MAX_TWEETS = args.count
-INTERVAL_MINUTES = args.interval
-OUTPUT_FILE = args.output
 PROCESSED_FILE = "processed_tweet_ids.json"
-CACHE_FILE = f"cache_{USERNAME}_tweets.json"
+NITTER_HEALTH_FILE = "nitter_health.json"  # 各Nitter实例最近一次失败的时间
+MIRROR_COOLDOWN_SECONDS = 5 * 60  # Nitter实例失败后暂停请求的时间（秒）
 CACHE_EXPIRY = 15  # 缓存过期时间（分钟）
-WINDOWS_SAVE_PATH = args.windows_path
+
+def configure(run_args):
+    """根据运行参数设置全局变量"""
+    global args, USERNAME, MAX_TWEETS, INTERVAL_MINUTES, OUTPUT_FILE, CACHE_FILE, WINDOWS_SAVE_PATH, WINDOWS_SIG_FILE
+    args = run_args
+    USERNAME = run_args.username
+    MAX_TWEETS = run_args.count
+    INTERVAL_MINUTES = run_args.interval
+    OUTPUT_FILE = run_args.output
+    CACHE_FILE = f"cache_{USERNAME}_scraped.msgpack"  # 只供本程序读取，使用msgpack二进制格式
+    WINDOWS_SAVE_PATH = run_args.windows_path
+    WINDOWS_SIG_FILE = f"cache_{USERNAME}_windows.sig"  # 上次保存到Windows系统的推文签名
+
+# 使用默认参数初始化，实际运行前会重新配置
+configure(parser.parse_args([]))
 
 # Nitter实例列表（可用的替代访问X的服务）
 NITTER_INSTANCES = [
@@ -67,236 +76,350 @@ NITTER_INSTANCES = [
     'https://nitter.pussthecat.org'
 ]
 
+# 推文链接中的推文ID（如 /username/status/1234567890）
+_STATUS_RE = re.compile(r'/status/(\d+)')
+
+# Nitter页面结构的CSS选择器
+SEL_TIMELINE = '.timeline'
+SEL_ITEM = '.timeline-item'
+SEL_LINK = '.tweet-link'
+SEL_RETWEET = '.retweet-header'
+SEL_CONTENT = '.tweet-content'
+SEL_DATE_LINK = '.tweet-date a'
+SEL_MEDIA_IMG = '.attachments .attachment img'
+
+# 随机使用的User-Agent，减少被检测的可能性
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0'
+)
+
+# 预先构建的请求头，每个User-Agent一组，请求时随机选择一组
+_HEADER_POOL = tuple(
+    {
+        'User-Agent': user_agent,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'DNT': '1',
+    }
+    for user_agent in USER_AGENTS
+)
+
+# 直接抓取X网站时使用的请求头，更接近浏览器发出的请求
+_DIRECT_HEADER_POOL = tuple(
+    {
+        **headers,
+        'Upgrade-Insecure-Requests': '1',
+        'Cache-Control': 'max-age=0',
+    }
+    for headers in _HEADER_POOL
+)
+
+# 直接抓取X网站时依次尝试的CSS选择器（根据X网站的最新结构）
+DIRECT_TWEET_SELECTORS = (
+    'article[data-testid="tweet"]',
+    'div[data-testid="tweet"]',
+    'article',
+    '.timeline-item'
+)
+DIRECT_CONTENT_SELECTORS = (
+    'div[data-testid="tweetText"]',
+    'div[lang]',
+    '.tweet-content'
+)
+DIRECT_IMG_SELECTORS = (
+    'img[alt="Image"]',
+    'img[alt="嵌入的图片"]',
+    'img.media-img'
+)
+
+# 各Nitter实例的请求超时时间（秒），所有实例同时请求，超时可以比逐个尝试时短
+NITTER_TIMEOUT = 8
+
+# 所有抓取请求（Nitter和直接抓取X网站）共用的HTTP客户端（线程安全），在各次抓取间复用连接，进程退出时关闭
+_CLIENT = httpx.Client(
+    http2=True,
+    follow_redirects=True,
+    timeout=15,
+    limits=httpx.Limits(max_keepalive_connections=20)
+)
+atexit.register(_CLIENT.close)
+
 def load_processed_tweets():
-    """加载已处理过的推文ID列表"""
+    """加载已处理过的推文ID集合"""
     if os.path.exists(PROCESSED_FILE):
         try:
-            with open(PROCESSED_FILE, 'r') as f:
-                return json.load(f)
+            with open(PROCESSED_FILE, 'rb') as f:
+                return set(orjson.loads(f.read()))
         except Exception as e:
-            logger.error(f"加载已处理推文记录失败: {e}")
-            return []
-    return []
+            logger.error("加载已处理推文记录失败: %s", e)
+            return set()
+    return set()
 
 def save_processed_tweets(processed_ids):
-    """保存已处理的推文ID列表"""
+    """保存已处理的推文ID集合（文件中保存为有序列表）"""
     try:
-        with open(PROCESSED_FILE, 'w') as f:
-            json.dump(processed_ids, f)
+        write_file_atomic(PROCESSED_FILE, orjson.dumps(sorted(processed_ids)))
     except Exception as e:
-        logger.error(f"保存已处理推文记录失败: {e}")
+        logger.error("保存已处理推文记录失败: %s", e)
 
 def is_valid_cache():
-    """检查缓存是否有效"""
+    """检查缓存是否有效（根据文件修改时间判断，无需读取和解析缓存内容）"""
     if args.force:
         return False
         
-    if not os.path.exists(CACHE_FILE):
-        return False
-        
     try:
-        with open(CACHE_FILE, 'r') as f:
-            cache_data = json.load(f)
-            
-        cache_time = datetime.fromisoformat(cache_data['timestamp'])
-        current_time = datetime.now()
-        # 检查是否在缓存过期时间内
-        if (current_time - cache_time).total_seconds() < CACHE_EXPIRY * 60:
-            return True
-    except Exception as e:
-        logger.error(f"检查缓存时出错: {e}")
+        cache_age = time.time() - os.path.getmtime(CACHE_FILE)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.error("检查缓存时出错: %s", e)
+        return False
         
-    return False
+    # 检查是否在缓存过期时间内
+    return cache_age < CACHE_EXPIRY * 60
 
 def load_tweets_from_cache():
     """从缓存加载推文"""
     try:
-        with open(CACHE_FILE, 'r') as f:
-            cache_data = json.load(f)
-        logger.info(f"从缓存加载了 {len(cache_data['tweets'])} 条推文")
+        with open(CACHE_FILE, 'rb') as f:
+            cache_data = msgpack.unpackb(f.read(), raw=False)
+        logger.info("从缓存加载了 %s 条推文", len(cache_data['tweets']))
         return cache_data['tweets']
     except Exception as e:
-        logger.error(f"从缓存加载推文时出错: {e}")
+        logger.error("从缓存加载推文时出错: %s", e)
         return []
 
-def scrape_tweets_from_nitter(username, max_count=10):
-    """从Nitter实例抓取用户的推文"""
-    tweets = []
-    session = HTMLSession()
+def load_mirror_stats():
+    """加载各Nitter实例最近一次失败的时间：实例 -> 失败时间（Unix时间戳）"""
+    if os.path.exists(NITTER_HEALTH_FILE):
+        try:
+            with open(NITTER_HEALTH_FILE, 'rb') as f:
+                stats = orjson.loads(f.read())
+            # 兼容旧版本记录（实例 -> {'ok', 'fail', 'last_failure'}）
+            return {instance: entry.get('last_failure', 0) if isinstance(entry, dict) else entry
+                    for instance, entry in stats.items()}
+        except Exception as e:
+            logger.error("加载Nitter实例健康记录失败: %s", e)
+    return {}
+
+def save_mirror_stats(stats):
+    """保存各Nitter实例最近一次失败的时间"""
+    try:
+        write_file_atomic(NITTER_HEALTH_FILE, orjson.dumps(stats, option=orjson.OPT_INDENT_2))
+    except Exception as e:
+        logger.error("保存Nitter实例健康记录失败: %s", e)
+
+def record_mirror_result(stats, instance, ok):
+    """记录一次Nitter实例请求的结果：失败时记录失败时间，成功时清除失败记录"""
+    if ok:
+        stats.pop(instance, None)
+    else:
+        stats[instance] = time.time()
+
+def get_healthy_instances(stats):
+    """返回本次要请求的Nitter实例，跳过最近失败过的实例
+    
+    所有实例都在冷却中时返回全部实例。各实例同时请求，因此不需要排序。
+    """
+    now = time.time()
+    instances = [instance for instance in NITTER_INSTANCES
+                 if now - stats.get(instance, 0) >= MIRROR_COOLDOWN_SECONDS]
+    return instances or list(NITTER_INSTANCES)
+
+def iter_timeline_items(tree):
+    """按页面顺序逐个返回时间线中的推文元素
+    
+    只遍历时间线容器的子元素（以及对话串中的推文），取到所需数量后即可停止，
+    不会为页面中其余的推文创建节点对象。找不到时间线容器时退回到全文档查找。
+    """
+    timeline = tree.css_first(SEL_TIMELINE)
+    if timeline is None:
+        yield from tree.css(SEL_ITEM)
+        return
+    
+    for node in timeline.iter():
+        classes = (node.attrs.get('class') or '').split()
+        if 'timeline-item' in classes:
+            yield node
+        elif 'thread-line' in classes:
+            # 对话串中的推文包裹在thread-line容器中
+            for child in node.iter():
+                if 'timeline-item' in (child.attrs.get('class') or '').split():
+                    yield child
+
+def fetch_nitter_timeline(instance, username, max_count):
+    """请求一个Nitter实例上的用户页面，返回页面中最多max_count个推文元素，请求失败时抛出异常"""
+    url = f"{instance}/{username}"
+    logger.info("尝试从 %s 抓取推文...", url)
     
-    # 随机打乱Nitter实例顺序，避免对单一实例压力过大
-    random.shuffle(NITTER_INSTANCES)
+    # 随机选择一组请求头（User-Agent不同），减少被检测的可能性
+    response = _CLIENT.get(url, headers=random.choice(_HEADER_POOL), timeout=NITTER_TIMEOUT)
+    response.raise_for_status()  # 如果请求失败，引发异常
     
-    # 尝试不同的Nitter实例，直到成功
-    for instance in NITTER_INSTANCES:
+    # 解析HTML并查找推文容器
+    tree = LexborHTMLParser(response.text)
+    return list(islice(iter_timeline_items(tree), max_count))
+
+def parse_nitter_timeline(tweet_elements, instance, username, max_count):
+    """从Nitter页面的推文元素中提取推文数据"""
+    tweets = []
+    for i, tweet_el in enumerate(tweet_elements):
+        if i >= max_count:
+            break
+            
         try:
-            url = f"{instance}/{username}"
-            logger.info(f"尝试从 {url} 抓取推文...")
+            # 提取推文ID
+            permalink = tweet_el.css_first(SEL_LINK)
+            if not permalink:
+                continue
+                
+            # attrs直接从解析树中按名称读取单个属性，不会像attributes那样每次构造完整的属性字典
+            tweet_url = permalink.attrs.get('href') or ''
+            tweet_id = tweet_url.split('/')[-1]
+            
+            # 检查是否是转发
+            is_retweet = tweet_el.css_first(SEL_RETWEET) is not None
+            if is_retweet:
+                logger.info("跳过转发推文 %s", tweet_id)
+                continue
             
-            # 随机化User-Agent，减少被检测的可能性
-            headers = {
-                'User-Agent': random.choice([
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15',
-                    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0'
-                ]),
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'DNT': '1',
+            # 提取推文内容
+            content_el = tweet_el.css_first(SEL_CONTENT)
+            content = content_el.text() if content_el else ''
+            
+            # 提取时间
+            time_link = tweet_el.css_first(SEL_DATE_LINK)
+            tweet_time = ''
+            if time_link:
+                tweet_time = time_link.attrs.get('title') or ''
+            
+            # 提取媒体
+            media = []
+            for img in tweet_el.css(SEL_MEDIA_IMG):
+                img_src = img.attrs.get('src')
+                if img_src:
+                    # 确保是完整的URL
+                    if img_src.startswith('/'):
+                        img_src = urljoin(instance, img_src)
+                    media.append({
+                        'type': 'photo',
+                        'url': img_src
+                    })
+            
+            # 创建推文对象
+            tweet = {
+                'id': tweet_id,
+                'content': content,
+                'created_at': tweet_time,
+                'url': f"https://twitter.com/{username}/status/{tweet_id}",
+                'media': media
             }
             
-            response = session.get(url, headers=headers, timeout=15)
-            response.raise_for_status()  # 如果请求失败，引发异常
+            tweets.append(tweet)
+            logger.info("已抓取推文 %s", tweet_id)
             
-            # 确保页面已经完全加载
+        except Exception as e:
+            logger.error("解析推文时出错: %s", e)
+            logger.debug("异常详情", exc_info=True)
+            continue
+    
+    return tweets
+
+def scrape_tweets_from_nitter(username, max_count=10):
+    """从Nitter实例抓取用户的推文
+    
+    同时向所有实例发出请求，使用最先返回推文的实例的结果，单个实例响应慢不会拖慢整体抓取。
+    已经发出的请求无法中途取消，返回结果后不再等待它们，它们会在NITTER_TIMEOUT超时后自行结束。
+    Nitter返回服务端渲染的静态HTML，无需执行JavaScript，直接用selectolax解析。
+    """
+    tweets = []
+    stats = load_mirror_stats()
+    instances = get_healthy_instances(stats)
+    
+    pool = ThreadPoolExecutor(max_workers=len(instances))
+    futures = {pool.submit(fetch_nitter_timeline, instance, username, max_count): instance for instance in instances}
+    try:
+        # 按完成顺序检查各实例的结果，直到成功
+        for future in as_completed(futures):
+            instance = futures[future]
             try:
-                response.html.render(timeout=30, sleep=2)
+                tweet_elements = future.result()
             except Exception as e:
-                logger.warning(f"JavaScript渲染失败，尝试直接解析HTML: {e}")
-            
-            # 查找推文容器
-            tweet_elements = response.html.find('.timeline-item')
+                logger.error("从 %s 抓取失败: %s", instance, e)
+                logger.debug("异常详情", exc_info=True)
+                record_mirror_result(stats, instance, False)
+                continue
             
             if not tweet_elements:
-                logger.warning(f"在 {instance} 上未找到推文元素，尝试另一个实例")
+                logger.warning("在 %s 上未找到推文元素，尝试另一个实例", instance)
+                record_mirror_result(stats, instance, False)
                 continue
                 
-            logger.info(f"在 {instance} 上找到 {len(tweet_elements)} 条推文")
-            
-            for i, tweet_el in enumerate(tweet_elements):
-                if i >= max_count:
-                    break
-                    
-                try:
-                    # 提取推文ID
-                    permalink = tweet_el.find('.tweet-link', first=True)
-                    if not permalink:
-                        continue
-                        
-                    tweet_url = permalink.attrs.get('href', '')
-                    tweet_id = tweet_url.split('/')[-1]
-                    
-                    # 检查是否是转发
-                    is_retweet = bool(tweet_el.find('.retweet-header', first=True))
-                    if is_retweet:
-                        logger.info(f"跳过转发推文 {tweet_id}")
-                        continue
-                    
-                    # 提取推文内容
-                    content_el = tweet_el.find('.tweet-content', first=True)
-                    content = content_el.text if content_el else ''
-                    
-                    # 提取时间
-                    time_el = tweet_el.find('.tweet-date', first=True)
-                    tweet_time = ''
-                    if time_el and time_el.find('a', first=True):
-                        time_link = time_el.find('a', first=True)
-                        if 'title' in time_link.attrs:
-                            tweet_time = time_link.attrs['title']
-                    
-                    # 提取媒体
-                    media = []
-                    media_els = tweet_el.find('.attachments .attachment')
-                    for media_el in media_els:
-                        img = media_el.find('img', first=True)
-                        if img and 'src' in img.attrs:
-                            img_src = img.attrs['src']
-                            # 确保是完整的URL
-                            if img_src.startswith('/'):
-                                img_src = urljoin(instance, img_src)
-                            media.append({
-                                'type': 'photo',
-                                'url': img_src
-                            })
-                    
-                    # 创建推文对象
-                    tweet = {
-                        'id': tweet_id,
-                        'content': content,
-                        'created_at': tweet_time,
-                        'url': f"https://twitter.com/{username}/status/{tweet_id}",
-                        'media': media
-                    }
-                    
-                    tweets.append(tweet)
-                    logger.info(f"已抓取推文 {tweet_id}")
-                    
-                except Exception as e:
-                    logger.error(f"解析推文时出错: {e}")
-                    logger.debug(traceback.format_exc())
-                    continue
+            logger.info("在 %s 上找到 %s 条推文", instance, len(tweet_elements))
+            tweets = parse_nitter_timeline(tweet_elements, instance, username, max_count)
+            record_mirror_result(stats, instance, bool(tweets))
             
-            # 如果成功获取了推文，跳出循环
+            # 如果成功获取了推文，不再等待其他实例
             if tweets:
                 break
-                
-        except Exception as e:
-            logger.error(f"从 {instance} 抓取失败: {e}")
-            logger.debug(traceback.format_exc())
-            continue
+    finally:
+        # 不等待仍在进行的请求（每个请求受NITTER_TIMEOUT限制），取消尚未开始的请求
+        pool.shutdown(wait=False, cancel_futures=True)
+        save_mirror_stats(stats)
     
-    session.close()
     return tweets
 
 def scrape_tweets_directly(username, max_count=10):
-    """直接从X网站抓取推文（备用方法）"""
+    """直接从X网站抓取推文（备用方法，需要requests-html渲染JavaScript）"""
+    # X网站需要执行JavaScript才能显示推文，仅在使用此备用方法时导入requests-html
+    try:
+        from requests_html import HTML
+    except ImportError as e:
+        logger.error("未安装requests-html库，无法直接抓取X网站: %s", e)
+        return []
+    
     tweets = []
-    session = HTMLSession()
+    page = None
     
     try:
         url = f"https://twitter.com/{username}"
-        logger.info(f"尝试从 {url} 抓取推文...")
-        
-        # 设置请求头，模拟浏览器
-        headers = {
-            'User-Agent': random.choice([
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.0 Safari/605.1.15',
-                'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0'
-            ]),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0',
-            'TE': 'Trailers',
-        }
+        logger.info("尝试从 %s 抓取推文...", url)
         
-        response = session.get(url, headers=headers, timeout=30)
+        # 页面通过共用的HTTP客户端下载，requests-html只用于渲染JavaScript
+        # 随机选择一组模拟浏览器的请求头
+        response = _CLIENT.get(url, headers=random.choice(_DIRECT_HEADER_POOL), timeout=30)
         response.raise_for_status()
+        page = HTML(url=str(response.url), html=response.text)
         
-        # 尝试渲染JavaScript
+        # 渲染JavaScript（只有使用--render时才会调用此方法）
         try:
-            response.html.render(timeout=40, sleep=3, keep_page=True)
+            page.render(timeout=40, sleep=3, keep_page=True)
         except Exception as e:
-            logger.warning(f"JavaScript渲染失败，将尝试直接解析HTML: {e}")
+            logger.warning("JavaScript渲染失败，将尝试直接解析HTML: %s", e)
         
         # 尝试查找推文元素（根据X网站的最新结构）
-        tweet_selectors = [
-            'article[data-testid="tweet"]',
-            'div[data-testid="tweet"]',
-            'article',
-            '.timeline-item'
-        ]
-        
         tweet_elements = []
-        for selector in tweet_selectors:
-            elements = response.html.find(selector)
+        for selector in DIRECT_TWEET_SELECTORS:
+            elements = page.find(selector)
             if elements:
                 tweet_elements = elements
-                logger.info(f"使用选择器 '{selector}' 找到 {len(elements)} 个推文元素")
+                logger.info("使用选择器 '%s' 找到 %s 个推文元素", selector, len(elements))
                 break
         
         if not tweet_elements:
             logger.warning("无法找到推文元素，尝试保存页面源码以供调试")
             with open(f"debug_{username}_page.html", "w", encoding="utf-8") as f:
-                f.write(response.html.html)
+                f.write(page.html)
             return []
             
-        logger.info(f"找到 {len(tweet_elements)} 个可能的推文元素")
+        logger.info("找到 %s 个可能的推文元素", len(tweet_elements))
+        
+        # 同一页面中各推文的结构相同，记住第一次匹配成功的内容和图片选择器
+        content_selector = None
+        img_selector = None
         
         for i, article in enumerate(tweet_elements):
             if i >= max_count:
@@ -308,37 +431,26 @@ def scrape_tweets_directly(username, max_count=10):
                 tweet_id = None
                 link_elements = article.find('a')
                 for link in link_elements:
-                    href = link.attrs.get('href', '')
-                    if '/status/' in href:
-                        tweet_id = href.split('/status/')[1].split('?')[0]
+                    match = _STATUS_RE.search(link.attrs.get('href', ''))
+                    if match:
+                        tweet_id = match.group(1)
                         break
                 
                 if not tweet_id:
                     continue
                 
-                # 提取推文内容
+                # 提取推文内容（找到匹配的选择器后，后续推文只使用该选择器）
                 content = ""
-                content_selectors = [
-                    'div[data-testid="tweetText"]',
-                    'div[lang]', 
-                    '.tweet-content'
-                ]
-                
-                for selector in content_selectors:
+                for selector in (content_selector,) if content_selector else DIRECT_CONTENT_SELECTORS:
                     elements = article.find(selector)
                     if elements:
                         content = elements[0].text
+                        content_selector = selector
                         break
                 
-                # 提取媒体
+                # 提取媒体（同样记住匹配的选择器）
                 media = []
-                img_selectors = [
-                    'img[alt="Image"]',
-                    'img[alt="嵌入的图片"]',
-                    'img.media-img'
-                ]
-                
-                for selector in img_selectors:
+                for selector in (img_selector,) if img_selector else DIRECT_IMG_SELECTORS:
                     img_elements = article.find(selector)
                     if img_elements:
                         for img in img_elements:
@@ -347,6 +459,7 @@ def scrape_tweets_directly(username, max_count=10):
                                     'type': 'photo',
                                     'url': img.attrs['src']
                                 })
+                        img_selector = selector
                         break
                 
                 # 创建时间（使用当前时间，因为难以准确提取）
@@ -361,50 +474,55 @@ def scrape_tweets_directly(username, max_count=10):
                 }
                 
                 tweets.append(tweet)
-                logger.info(f"已抓取推文 {tweet_id}")
+                logger.info("已抓取推文 %s", tweet_id)
                 
             except Exception as e:
-                logger.error(f"解析推文时出错: {e}")
-                logger.debug(traceback.format_exc())
+                logger.error("解析推文时出错: %s", e)
+                logger.debug("异常详情", exc_info=True)
                 continue
         
     except Exception as e:
-        logger.error(f"直接抓取X网站失败: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("直接抓取X网站失败: %s", e)
+        logger.debug("异常详情", exc_info=True)
+    finally:
+        # 关闭渲染使用的浏览器
+        if page is not None:
+            page.session.close()
     
-    session.close()
     return tweets
 
 def save_cache_file(tweets, username):
     """保存推文到缓存文件"""
     try:
         cache_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': time.time(),
             'tweets': tweets
         }
         
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        write_file_atomic(CACHE_FILE, msgpack.packb(cache_data, use_bin_type=True))
             
-        logger.info(f"已将 {len(tweets)} 条推文保存到缓存")
+        logger.info("已将 %s 条推文保存到缓存", len(tweets))
     except Exception as e:
-        logger.error(f"保存推文到缓存时出错: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("保存推文到缓存时出错: %s", e)
+        logger.debug("异常详情", exc_info=True)
 
 def filter_new_tweets(tweets, processed_ids):
     """过滤出未处理过的新推文"""
+    # 传入列表时先转换为集合，保证每次查找都是常数时间
+    if not isinstance(processed_ids, (set, frozenset)):
+        processed_ids = frozenset(processed_ids)
     new_tweets = [tweet for tweet in tweets if tweet['id'] not in processed_ids]
     return new_tweets
 
 def save_tweets_to_file(tweets, filename):
     """保存推文到文件"""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(tweets, f, ensure_ascii=False, indent=2)
-        logger.info(f"已保存 {len(tweets)} 条推文到 {filename}")
+        # 输出文件供其他程序读取，不缩进
+        write_file_atomic(filename, orjson.dumps(tweets))
+        logger.info("已保存 %s 条推文到 %s", len(tweets), filename)
     except Exception as e:
-        logger.error(f"保存推文到文件时出错: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("保存推文到文件时出错: %s", e)
+        logger.debug("异常详情", exc_info=True)
 
 def save_tweets_to_windows(tweets, username):
     """保存推文到Windows系统"""
@@ -413,23 +531,12 @@ def save_tweets_to_windows(tweets, username):
         return False
     
     try:
-        # 检查是否在WSL环境中
-        is_wsl = "microsoft" in platform.uname().release.lower()
-        
-        if not is_wsl:
+        if not is_wsl():
             logger.warning("当前不是WSL环境，无法使用/mnt路径保存到Windows，尝试直接保存")
             windows_path = WINDOWS_SAVE_PATH
         else:
-            # 处理Windows路径
-            # 如果提供的是Windows格式路径（如C:/Users/...），将其转换为WSL路径格式
-            if ':' in WINDOWS_SAVE_PATH:
-                # 从Windows路径格式（如C:/Users/username/Documents）转换为WSL格式
-                drive_letter = WINDOWS_SAVE_PATH[0].lower()
-                path_part = WINDOWS_SAVE_PATH[2:].replace('\\', '/')
-                windows_path = f"/mnt/{drive_letter}/{path_part}"
-            else:
-                # 已经是WSL路径格式
-                windows_path = WINDOWS_SAVE_PATH
+            # 如果提供的是Windows格式路径（如C:/Users/username/Documents），将其转换为WSL路径格式
+            windows_path = to_wsl_path(WINDOWS_SAVE_PATH)
         
         # 创建目标目录（如果不存在）
         os.makedirs(windows_path, exist_ok=True)
@@ -440,16 +547,50 @@ def save_tweets_to_windows(tweets, username):
         full_path = os.path.join(windows_path, filename)
         
         # 保存推文到文件
-        with open(full_path, 'w', encoding='utf-8') as f:
-            json.dump(tweets, f, ensure_ascii=False, indent=2)
+        write_file_atomic(full_path, orjson.dumps(tweets, option=orjson.OPT_INDENT_2))
             
-        logger.info(f"已将 {len(tweets)} 条推文原文保存到Windows系统: {full_path}")
+        logger.info("已将 %s 条推文原文保存到Windows系统: %s", len(tweets), full_path)
         return True
     except Exception as e:
-        logger.error(f"保存推文到Windows系统时出错: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("保存推文到Windows系统时出错: %s", e)
+        logger.debug("异常详情", exc_info=True)
         return False
 
+def tweets_signature(tweets):
+    """根据推文ID计算推文集合的签名，用于判断推文是否有变化"""
+    return hashlib.blake2b(orjson.dumps([tweet['id'] for tweet in tweets]), digest_size=8).hexdigest()
+
+def load_windows_signature():
+    """读取上次保存到Windows系统的推文签名，没有记录时返回None"""
+    try:
+        with open(WINDOWS_SIG_FILE, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def save_windows_signature(signature):
+    """记录本次保存到Windows系统的推文签名"""
+    try:
+        with open(WINDOWS_SIG_FILE, 'w') as f:
+            f.write(signature)
+    except OSError as e:
+        logger.error("保存推文签名失败: %s", e)
+
+def export_tweets_to_windows(tweets, username):
+    """保存推文到Windows系统，与上次保存的推文相同时跳过，避免重复生成相同内容的文件"""
+    if not WINDOWS_SAVE_PATH:
+        return False
+    
+    signature = tweets_signature(tweets)
+    if signature == load_windows_signature():
+        logger.info("推文与上次保存到Windows系统的相同，跳过保存")
+        return False
+    
+    if save_tweets_to_windows(tweets, username):
+        save_windows_signature(signature)
+        return True
+    return False
+
 def get_mock_tweets():
     """生成模拟推文数据用于测试"""
     logger.info("生成模拟推文数据用于测试")
@@ -482,8 +623,8 @@ def get_mock_tweets():
     return mock_tweets
 
 def main():
-    """主函数"""
-    logger.info(f"开始抓取 @{USERNAME} 的推文")
+    """主函数，返回抓取到的推文列表，抓取失败时返回空列表"""
+    logger.info("开始抓取 @%s 的推文", USERNAME)
     
     # 检查缓存是否有效
     if is_valid_cache() and not args.force:
@@ -498,17 +639,21 @@ def main():
             # 先尝试从Nitter抓取
             tweets = scrape_tweets_from_nitter(USERNAME, MAX_TWEETS)
             
-            # 如果Nitter抓取失败，尝试直接抓取
+            # 如果Nitter抓取失败，在启用渲染时尝试直接抓取
+            # （X网站必须执行JavaScript才能显示推文，渲染需要启动Chromium，耗时且占用内存）
             if not tweets:
-                logger.warning("从Nitter抓取失败，尝试直接抓取X网站")
-                tweets = scrape_tweets_directly(USERNAME, MAX_TWEETS)
+                if args.render:
+                    logger.warning("从Nitter抓取失败，尝试直接抓取X网站")
+                    tweets = scrape_tweets_directly(USERNAME, MAX_TWEETS)
+                else:
+                    logger.warning("从Nitter抓取失败，未启用--render，跳过直接抓取X网站")
         
         # 如果抓取成功或使用了模拟数据，保存到缓存
         if tweets:
             save_cache_file(tweets, USERNAME)
         else:
             logger.error("抓取失败，未获取到任何推文")
-            return
+            return []
     
     # 加载已处理的推文ID
     processed_ids = load_processed_tweets()
@@ -517,24 +662,81 @@ def main():
     new_tweets = filter_new_tweets(tweets, processed_ids)
     
     if new_tweets:
-        logger.info(f"发现 {len(new_tweets)} 条新推文")
+        logger.info("发现 %s 条新推文", len(new_tweets))
         # 保存新推文到输出文件
         save_tweets_to_file(new_tweets, OUTPUT_FILE)
         # 保存推文到Windows系统
-        save_tweets_to_windows(new_tweets, USERNAME)
+        export_tweets_to_windows(new_tweets, USERNAME)
     else:
         logger.info("没有发现新推文")
         # 即使没有新推文，也保存所有已抓取推文到Windows系统
-        if WINDOWS_SAVE_PATH:
-            save_tweets_to_windows(tweets, USERNAME)
+        export_tweets_to_windows(tweets, USERNAME)
     
     logger.info("抓取完成")
+    return tweets
 
-if __name__ == "__main__":
+def scrape_user(username, count=10, force=True, windows_path=None, test=False, render=False):
+    """抓取指定用户的推文并直接返回推文列表，供其他模块在进程内调用，失败时返回空列表"""
+    scrape_args = ['--username', username, '--count', str(count), '--once']
+    if force:
+        scrape_args.append('--force')
+    if windows_path:
+        scrape_args.extend(['--windows-path', windows_path])
+    if test:
+        scrape_args.append('--test')
+    if render:
+        scrape_args.append('--render')
+    
+    configure(parser.parse_args(scrape_args))
+    try:
+        return main()
+    except Exception as e:
+        logger.error("抓取 @%s 的推文时出错: %s", username, e)
+        logger.debug("异常详情", exc_info=True)
+        return []
+
+def run_for_user(run_args, username):
+    """使用指定用户名配置并执行一次抓取，出错时只记录日志，不影响其他用户"""
+    configure(argparse.Namespace(**{**vars(run_args), 'username': username}))
     try:
         main()
+    except Exception as e:
+        logger.error("抓取 @%s 的推文时出错: %s", username, e)
+        logger.debug("异常详情", exc_info=True)
+
+async def scheduler(run_args):
+    """定时抓取循环，抓取在工作线程中运行，等待期间使用asyncio.sleep，中断时立即退出"""
+    usernames = [name.strip() for name in run_args.username.split(',') if name.strip()]
+    
+    # 模块的运行配置是全局变量，各用户在同一个工作线程中依次抓取，共用同一个HTTP连接池
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="XScraper") as pool:
+        while True:
+            for username in usernames:
+                await loop.run_in_executor(pool, run_for_user, run_args, username)
+            
+            # 如果只运行一次就退出
+            if run_args.once:
+                break
+            
+            next_check = datetime.now() + timedelta(minutes=run_args.interval)
+            logger.info("下一次检查时间: %s", next_check.strftime('%Y-%m-%d %H:%M:%S'))
+            await asyncio.sleep(run_args.interval * 60)
+
+if __name__ == "__main__":
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("x_scraper.log"),
+            logging.StreamHandler()
+        ]
+    )
+    try:
+        asyncio.run(scheduler(parser.parse_args()))
     except KeyboardInterrupt:
         logger.info("程序被用户中断")
     except Exception as e:
-        logger.error(f"程序运行出错: {e}")
-        logger.debug(traceback.format_exc()) 
\ No newline at end of file
+        logger.error("程序运行出错: %s", e)
+        logger.debug("异常详情", exc_info=True) 
\ No newline at end of file